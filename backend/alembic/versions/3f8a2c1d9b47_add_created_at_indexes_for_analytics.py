@@ -0,0 +1,26 @@
+"""Add created_at indexes for analytics date-range filters
+
+Revision ID: 3f8a2c1d9b47
+Revises: 02188806888f
+Create Date: 2026-10-16 09:12:41.208315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8a2c1d9b47'
+down_revision = '02188806888f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_interests_created_at'), 'interests', ['created_at'], unique=False)
+    op.create_index(op.f('ix_groups_created_at'), 'groups', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_groups_created_at'), table_name='groups')
+    op.drop_index(op.f('ix_interests_created_at'), table_name='interests')
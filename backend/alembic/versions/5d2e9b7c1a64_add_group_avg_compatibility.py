@@ -0,0 +1,24 @@
+"""Add avg_compatibility to groups
+
+Revision ID: 5d2e9b7c1a64
+Revises: 8c41e7d2a5f3
+Create Date: 2026-10-16 12:18:44.209513
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2e9b7c1a64'
+down_revision = '8c41e7d2a5f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('groups', sa.Column('avg_compatibility', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('groups', 'avg_compatibility')
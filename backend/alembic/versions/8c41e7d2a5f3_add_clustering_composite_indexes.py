@@ -0,0 +1,36 @@
+"""Add composite indexes for clustering status queries
+
+Revision ID: 8c41e7d2a5f3
+Revises: 3f8a2c1d9b47
+Create Date: 2026-10-16 11:03:27.641982
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41e7d2a5f3'
+down_revision = '3f8a2c1d9b47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_interests_group_id'), 'interests', ['group_id'], unique=False)
+    op.create_index('ix_interests_destination_id_status', 'interests', ['destination_id', 'status'], unique=False)
+    op.create_index(
+        'ix_interests_matched_updated_at', 'interests', ['updated_at'], unique=False,
+        postgresql_where=sa.text("status = 'matched'")
+    )
+    op.create_index(
+        'ix_groups_destination_id_status_created_at', 'groups',
+        ['destination_id', 'status', sa.text('created_at DESC')], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_groups_destination_id_status_created_at', table_name='groups')
+    op.drop_index('ix_interests_matched_updated_at', table_name='interests')
+    op.drop_index('ix_interests_destination_id_status', table_name='interests')
+    op.drop_index(op.f('ix_interests_group_id'), table_name='interests')
@@ -0,0 +1,34 @@
+"""Add social_proof_cache table
+
+Revision ID: a7c3e5f9d218
+Revises: 5d2e9b7c1a64
+Create Date: 2026-10-16 14:02:51.377104
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e5f9d218'
+down_revision = '5d2e9b7c1a64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('social_proof_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('scope', sa.String(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('generated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_social_proof_cache_id'), 'social_proof_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_social_proof_cache_scope'), 'social_proof_cache', ['scope'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_social_proof_cache_scope'), table_name='social_proof_cache')
+    op.drop_index(op.f('ix_social_proof_cache_id'), table_name='social_proof_cache')
+    op.drop_table('social_proof_cache')
@@ -0,0 +1,68 @@
+"""Add indexes for traveler and document list filters
+
+Revision ID: c2f8d4a6e913
+Revises: a7c3e5f9d218
+Create Date: 2026-10-16 15:12:40.218564
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2f8d4a6e913'
+down_revision = 'a7c3e5f9d218'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    
+    # CONCURRENTLY cannot run inside a transaction; build without locking writes on live tables
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_interests_user_id_status', 'interests', ['user_id', 'status'],
+            unique=False, postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_user_documents_user_id_document_type', 'user_documents', ['user_id', 'document_type'],
+            unique=False, postgresql_where=sa.text('is_active'), postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_user_documents_pending', 'user_documents', ['id'], unique=False,
+            postgresql_where=sa.text("verification_status = 'pending' AND is_active"),
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_passenger_documents_user_id_uploaded_at', 'passenger_documents',
+            ['user_id', sa.text('uploaded_at DESC')], unique=False,
+            postgresql_where=sa.text('is_active'), postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_passenger_documents_pending', 'passenger_documents', ['id'], unique=False,
+            postgresql_where=sa.text("verification_status = 'pending' AND is_active"),
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_travel_documents_group_id_destination_id', 'travel_documents', ['group_id', 'destination_id'],
+            unique=False, postgresql_where=sa.text('is_active'), postgresql_concurrently=True
+        )
+        for column in ('name', 'email', 'phone'):
+            op.create_index(
+                f'ix_users_{column}_trgm', 'users', [column], unique=False,
+                postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for column in ('phone', 'email', 'name'):
+            op.drop_index(f'ix_users_{column}_trgm', table_name='users', postgresql_concurrently=True)
+        op.drop_index('ix_travel_documents_group_id_destination_id', table_name='travel_documents', postgresql_concurrently=True)
+        op.drop_index('ix_passenger_documents_pending', table_name='passenger_documents', postgresql_concurrently=True)
+        op.drop_index('ix_passenger_documents_user_id_uploaded_at', table_name='passenger_documents', postgresql_concurrently=True)
+        op.drop_index('ix_user_documents_pending', table_name='user_documents', postgresql_concurrently=True)
+        op.drop_index('ix_user_documents_user_id_document_type', table_name='user_documents', postgresql_concurrently=True)
+        op.drop_index('ix_interests_user_id_status', table_name='interests', postgresql_concurrently=True)
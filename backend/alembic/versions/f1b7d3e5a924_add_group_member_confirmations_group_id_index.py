@@ -0,0 +1,33 @@
+"""Add group_id index on group member confirmations
+
+Revision ID: f1b7d3e5a924
+Revises: c2f8d4a6e913
+Create Date: 2026-10-16 18:41:07.553120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b7d3e5a924'
+down_revision = 'c2f8d4a6e913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside a transaction; build without locking writes on live tables
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_group_member_confirmations_group_id', 'group_member_confirmations', ['group_id'],
+            unique=False, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_group_member_confirmations_group_id', table_name='group_member_confirmations',
+            postgresql_concurrently=True
+        )
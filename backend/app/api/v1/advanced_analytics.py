@@ -3,46 +3,143 @@ Advanced Analytics API Endpoints
 Provides comprehensive business intelligence and analytics data
 """
 
-from datetime import datetime, timedelta
-from typing import Optional
+import asyncio
+import csv
+import io
+import operator
+from datetime import date, datetime, timedelta
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, List, Literal, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
+from app.core.cache import DASHBOARD_SUMMARY_CACHE, build_cache_key, cache_get, cache_set, cached_response
+from app.core.database import SessionLocal, get_db
 from app.services.advanced_analytics_service import AdvancedAnalyticsService
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Export payloads are reused across json/csv downloads of the same report
+_EXPORT_CACHE_TTL = 900
+
+# Dashboard summaries may be served from Redis up to this many seconds after generated_at
+_DASHBOARD_SUMMARY_TTL = 60
+
+# Dashboard period -> number of days covered
+_PERIOD_DAYS = MappingProxyType({"7d": 7, "30d": 30, "90d": 90})
+
+# Dashboard alert rules: (section, metric, comparator, threshold, alert type, message)
+_ALERT_RULES = (
+    ("key_metrics", "conversion_rate", operator.lt, 5, "warning",
+     "Conversion rate is below 5%. Consider optimizing the user journey."),
+    ("trends", "revenue_growth", operator.lt, -10, "critical",
+     "Revenue is declining significantly. Immediate attention required."),
+    ("key_metrics", "repeat_rate", operator.lt, 20, "info",
+     "Low repeat user rate. Consider implementing retention strategies."),
+)
+
+
+def _evaluate_alerts(summary: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Apply _ALERT_RULES to a dashboard summary in a single pass"""
+    alerts = []
+    for section, metric, compare, threshold, alert_type, message in _ALERT_RULES:
+        value = summary.get(section, {}).get(metric, 0)
+        if compare(value, threshold):
+            alerts.append({
+                "type": alert_type,
+                "message": message,
+                "metric": metric,
+                "value": value
+            })
+    return alerts
+
+
+def _run_with_session(method_name: str, *args):
+    """Run an AdvancedAnalyticsService method on a dedicated session (safe to call from a worker thread)"""
+    db = SessionLocal()
+    try:
+        return getattr(AdvancedAnalyticsService(db), method_name)(*args)
+    finally:
+        db.close()
+
+
+def get_analytics_service(db: Session = Depends(get_db)) -> AdvancedAnalyticsService:
+    """Provide a request-scoped AdvancedAnalyticsService bound to the request's session"""
+    return AdvancedAnalyticsService(db)
+
+
+def _funnel_rows(data: Dict[str, Any]) -> Iterator[List[Any]]:
+    yield ["stage", "count", "percentage", "conversion_rate"]
+    for stage, metrics in data.get("funnel_stages", {}).items():
+        yield [stage, metrics.get("count"), metrics.get("percentage"), metrics.get("conversion_rate", "")]
+
+
+def _revenue_rows(data: Dict[str, Any]) -> Iterator[List[Any]]:
+    yield ["period", "revenue", "bookings", "travelers"]
+    for point in data.get("time_series", []):
+        yield [point["period"], point["revenue"], point["bookings"], point["travelers"]]
+
+
+_PERFORMANCE_METRICS = (
+    "total_interests", "unique_users", "avg_group_size", "groups_formed",
+    "revenue_generated", "conversion_rate", "momentum_score"
+)
+
+
+def _performance_rows(data: Dict[str, Any]) -> Iterator[List[Any]]:
+    yield ["ranking", "destination_id", "name", "country", *_PERFORMANCE_METRICS]
+    for dest in data.get("destinations", []):
+        metrics = dest["metrics"]
+        yield [dest["ranking"], dest["destination_id"], dest["name"], dest["country"],
+               *(metrics.get(name) for name in _PERFORMANCE_METRICS)]
+
+
+def _behavior_rows(data: Dict[str, Any]) -> Iterator[List[Any]]:
+    yield ["section", "metric", "value"]
+    for metric, value in data.get("user_metrics", {}).items():
+        yield ["user_metrics", metric, value]
+    for segment, count in data.get("user_segments", {}).items():
+        yield ["user_segments", segment, count]
+    for point in data.get("engagement_patterns", {}).get("peak_hours", []):
+        yield ["peak_hours", point["hour"], point["activity"]]
+
+
+# Per-report adapters that flatten nested analytics payloads into CSV rows
+_CSV_ROW_ADAPTERS = {
+    "funnel": _funnel_rows,
+    "revenue": _revenue_rows,
+    "performance": _performance_rows,
+    "behavior": _behavior_rows,
+}
+
+
+def _iter_csv(rows: Iterable[List[Any]]) -> Iterator[str]:
+    """Encode rows as CSV one line at a time, reusing a single small buffer"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
 
 
 @router.get("/conversion-funnel")
+@cached_response("advanced-analytics:conversion-funnel", expire=300, exclude=("analytics",))
 async def get_conversion_funnel(
-    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
     destination_id: Optional[int] = Query(None, description="Filter by destination ID"),
-    db: Session = Depends(get_db)
+    analytics: AdvancedAnalyticsService = Depends(get_analytics_service)
 ):
     """
     Get detailed conversion funnel analysis showing how users move through
     the journey from interest expression to payment completion.
     """
     try:
-        # Parse dates if provided
-        parsed_start = None
-        parsed_end = None
-        
-        if start_date:
-            parsed_start = datetime.strptime(start_date, "%Y-%m-%d")
-        if end_date:
-            parsed_end = datetime.strptime(end_date, "%Y-%m-%d")
-        
-        analytics = AdvancedAnalyticsService(db)
-        
-        funnel_data = analytics.get_conversion_funnel(
-            start_date=parsed_start,
-            end_date=parsed_end,
-            destination_id=destination_id
-        )
+        funnel_data = analytics.get_conversion_funnel(start_date, end_date, destination_id)
         
         if not funnel_data:
             return {
@@ -55,52 +152,29 @@ async def get_conversion_funnel(
             "success": True,
             "data": funnel_data,
             "meta": {
-                "generated_at": datetime.now().isoformat(),
-                "data_points": sum(
-                    stage["count"] for stage in funnel_data.get("funnel_stages", {}).values()
-                    if isinstance(stage, dict) and "count" in stage
-                )
+                "generated_at": datetime.now(),
+                "data_points": funnel_data["summary"]["total_data_points"]
             }
         }
         
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid date format: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating conversion funnel: {str(e)}")
 
 
 @router.get("/revenue-analytics")
+@cached_response("advanced-analytics:revenue-analytics", expire=300, exclude=("analytics",))
 async def get_revenue_analytics(
-    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
-    group_by: str = Query("month", description="Group by: day, week, month"),
-    db: Session = Depends(get_db)
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
+    group_by: Literal["day", "week", "month"] = Query("month", description="Group by: day, week, month"),
+    analytics: AdvancedAnalyticsService = Depends(get_analytics_service)
 ):
     """
     Get comprehensive revenue analytics including time series data,
     destination breakdown, and growth metrics.
     """
     try:
-        # Validate group_by parameter
-        if group_by not in ["day", "week", "month"]:
-            raise HTTPException(status_code=400, detail="group_by must be one of: day, week, month")
-        
-        # Parse dates if provided
-        parsed_start = None
-        parsed_end = None
-        
-        if start_date:
-            parsed_start = datetime.strptime(start_date, "%Y-%m-%d")
-        if end_date:
-            parsed_end = datetime.strptime(end_date, "%Y-%m-%d")
-        
-        analytics = AdvancedAnalyticsService(db)
-        
-        revenue_data = analytics.get_revenue_analytics(
-            start_date=parsed_start,
-            end_date=parsed_end,
-            group_by=group_by
-        )
+        revenue_data = analytics.get_revenue_analytics(start_date, end_date, group_by)
         
         if not revenue_data:
             return {
@@ -113,51 +187,31 @@ async def get_revenue_analytics(
             "success": True,
             "data": revenue_data,
             "meta": {
-                "generated_at": datetime.now().isoformat(),
+                "generated_at": datetime.now(),
                 "time_periods": len(revenue_data.get("time_series", [])),
                 "destinations_analyzed": len(revenue_data.get("revenue_by_destination", {}))
             }
         }
         
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid date format: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating revenue analytics: {str(e)}")
 
 
 @router.get("/destination-performance")
+@cached_response("advanced-analytics:destination-performance", expire=300, exclude=("analytics",))
 async def get_destination_performance(
-    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
     limit: int = Query(20, description="Maximum number of destinations to return"),
-    sort_by: str = Query("interests", description="Sort by: interests, revenue, conversion"),
-    db: Session = Depends(get_db)
+    sort_by: Literal["interests", "revenue", "conversion"] = Query("interests", description="Sort by: interests, revenue, conversion"),
+    analytics: AdvancedAnalyticsService = Depends(get_analytics_service)
 ):
     """
     Get detailed performance metrics for destinations including
     interest counts, conversion rates, and revenue generation.
     """
     try:
-        # Validate sort_by parameter
-        if sort_by not in ["interests", "revenue", "conversion"]:
-            raise HTTPException(status_code=400, detail="sort_by must be one of: interests, revenue, conversion")
-        
-        # Parse dates if provided
-        parsed_start = None
-        parsed_end = None
-        
-        if start_date:
-            parsed_start = datetime.strptime(start_date, "%Y-%m-%d")
-        if end_date:
-            parsed_end = datetime.strptime(end_date, "%Y-%m-%d")
-        
-        analytics = AdvancedAnalyticsService(db)
-        
-        performance_data = analytics.get_destination_performance(
-            start_date=parsed_start,
-            end_date=parsed_end,
-            limit=limit
-        )
+        performance_data = analytics.get_destination_performance(start_date, end_date, limit, sort_by)
         
         if not performance_data:
             return {
@@ -166,62 +220,36 @@ async def get_destination_performance(
                 "summary": {}
             }
         
-        # Apply sorting based on sort_by parameter
+        # Destinations arrive already sorted and ranked by sort_by from the database
         destinations = performance_data.get("destinations", [])
-        if sort_by == "revenue":
-            destinations.sort(key=lambda x: x["metrics"]["revenue_generated"], reverse=True)
-        elif sort_by == "conversion":
-            destinations.sort(key=lambda x: x["metrics"]["conversion_rate"], reverse=True)
-        # Default is already sorted by interests
-        
-        # Update rankings after sorting
-        for i, dest in enumerate(destinations):
-            dest["ranking"] = i + 1
-        
-        performance_data["destinations"] = destinations
         
         return {
             "success": True,
             "data": performance_data,
             "meta": {
-                "generated_at": datetime.now().isoformat(),
+                "generated_at": datetime.now(),
                 "sorted_by": sort_by,
                 "destinations_returned": len(destinations)
             }
         }
         
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid date format: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating destination performance: {str(e)}")
 
 
 @router.get("/user-behavior")
+@cached_response("advanced-analytics:user-behavior", expire=300, exclude=("analytics",))
 async def get_user_behavior_analytics(
-    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
-    db: Session = Depends(get_db)
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
+    analytics: AdvancedAnalyticsService = Depends(get_analytics_service)
 ):
     """
     Get comprehensive user behavior analytics including engagement patterns,
     user segments, and journey insights.
     """
     try:
-        # Parse dates if provided
-        parsed_start = None
-        parsed_end = None
-        
-        if start_date:
-            parsed_start = datetime.strptime(start_date, "%Y-%m-%d")
-        if end_date:
-            parsed_end = datetime.strptime(end_date, "%Y-%m-%d")
-        
-        analytics = AdvancedAnalyticsService(db)
-        
-        behavior_data = analytics.get_user_behavior_analytics(
-            start_date=parsed_start,
-            end_date=parsed_end
-        )
+        behavior_data = analytics.get_user_behavior_analytics(start_date, end_date)
         
         if not behavior_data:
             return {
@@ -234,21 +262,19 @@ async def get_user_behavior_analytics(
             "success": True,
             "data": behavior_data,
             "meta": {
-                "generated_at": datetime.now().isoformat(),
+                "generated_at": datetime.now(),
                 "users_analyzed": behavior_data.get("user_metrics", {}).get("total_users", 0)
             }
         }
         
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid date format: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating user behavior analytics: {str(e)}")
 
 
 @router.get("/dashboard-summary")
+@cached_response(DASHBOARD_SUMMARY_CACHE, expire=_DASHBOARD_SUMMARY_TTL)
 async def get_dashboard_summary(
-    period: str = Query("30d", description="Time period: 7d, 30d, 90d"),
-    db: Session = Depends(get_db)
+    period: Literal["7d", "30d", "90d"] = Query("30d", description="Time period: 7d, 30d, 90d")
 ):
     """
     Get a comprehensive dashboard summary with key metrics across all analytics areas.
@@ -256,86 +282,37 @@ async def get_dashboard_summary(
     """
     try:
         # Calculate date range based on period
-        period_map = {
-            "7d": 7,
-            "30d": 30,
-            "90d": 90
-        }
-        
-        if period not in period_map:
-            raise HTTPException(status_code=400, detail="period must be one of: 7d, 30d, 90d")
-        
-        days = period_map[period]
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
+        days = _PERIOD_DAYS[period]
+        now = datetime.now()
+        end_date = now
+        start_date = now - timedelta(days=days)
         
-        analytics = AdvancedAnalyticsService(db)
-        
-        # Get data from all analytics services
-        funnel_data = analytics.get_conversion_funnel(start_date, end_date)
-        revenue_data = analytics.get_revenue_analytics(start_date, end_date, "week")
-        performance_data = analytics.get_destination_performance(start_date, end_date, 5)
-        behavior_data = analytics.get_user_behavior_analytics(start_date, end_date)
+        # Headline metrics come from one consolidated query; run it off the event loop
+        bundle = await asyncio.to_thread(_run_with_session, "get_dashboard_bundle", start_date, end_date, 3)
         
-        # Extract key metrics for summary
         summary = {
             "period": {
                 "days": days,
-                "start_date": start_date.isoformat(),
-                "end_date": end_date.isoformat()
+                "start_date": start_date,
+                "end_date": end_date
             },
-            "key_metrics": {
-                "total_interests": funnel_data.get("funnel_stages", {}).get("interests_expressed", {}).get("count", 0),
-                "conversion_rate": funnel_data.get("summary", {}).get("overall_conversion_rate", 0),
-                "total_revenue": revenue_data.get("summary", {}).get("total_revenue", 0),
-                "total_bookings": revenue_data.get("summary", {}).get("total_bookings", 0),
-                "avg_booking_value": revenue_data.get("summary", {}).get("average_booking_value", 0),
-                "total_users": behavior_data.get("user_metrics", {}).get("total_users", 0),
-                "repeat_rate": behavior_data.get("user_metrics", {}).get("repeat_rate", 0)
-            },
-            "trends": {
-                "revenue_growth": revenue_data.get("growth_metrics", {}).get("growth_rate", 0),
-                "revenue_trend": revenue_data.get("growth_metrics", {}).get("trend", "stable"),
-                "drop_off_points": funnel_data.get("summary", {}).get("drop_off_points", [])
-            },
-            "top_destinations": performance_data.get("destinations", [])[:3],
+            "key_metrics": bundle.get("key_metrics", {}),
+            "trends": bundle.get("trends", {}),
+            "top_destinations": bundle.get("top_destinations", []),
             "alerts": []
         }
         
         # Generate alerts based on key metrics
-        alerts = []
-        if summary["key_metrics"]["conversion_rate"] < 5:
-            alerts.append({
-                "type": "warning",
-                "message": "Conversion rate is below 5%. Consider optimizing the user journey.",
-                "metric": "conversion_rate",
-                "value": summary["key_metrics"]["conversion_rate"]
-            })
-        
-        if summary["trends"]["revenue_growth"] < -10:
-            alerts.append({
-                "type": "critical",
-                "message": "Revenue is declining significantly. Immediate attention required.",
-                "metric": "revenue_growth",
-                "value": summary["trends"]["revenue_growth"]
-            })
-        
-        if behavior_data.get("user_metrics", {}).get("repeat_rate", 0) < 20:
-            alerts.append({
-                "type": "info",
-                "message": "Low repeat user rate. Consider implementing retention strategies.",
-                "metric": "repeat_rate",
-                "value": behavior_data.get("user_metrics", {}).get("repeat_rate", 0)
-            })
-        
+        alerts = _evaluate_alerts(summary)
         summary["alerts"] = alerts
         
         return {
             "success": True,
             "data": summary,
             "meta": {
-                "generated_at": datetime.now().isoformat(),
-                "data_freshness": "real_time",
+                "generated_at": now,
+                "data_freshness": "cached",
+                "max_age": _DASHBOARD_SUMMARY_TTL,
                 "alert_count": len(alerts)
             }
         }
@@ -345,43 +322,38 @@ async def get_dashboard_summary(
 
 
 @router.get("/export")
-async def export_analytics_data(
-    report_type: str = Query(..., description="Type of report: funnel, revenue, performance, behavior"),
-    format: str = Query("json", description="Export format: json, csv"),
-    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
-    db: Session = Depends(get_db)
+def export_analytics_data(
+    report_type: Literal["funnel", "revenue", "performance", "behavior"] = Query(..., description="Type of report: funnel, revenue, performance, behavior"),
+    format: Literal["json", "csv"] = Query("json", description="Export format: json, csv"),
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
+    analytics: AdvancedAnalyticsService = Depends(get_analytics_service)
 ):
     """
     Export analytics data in various formats for external analysis or reporting.
+    Sync handler: the cache lookups and report queries block, so FastAPI runs it in the threadpool.
     """
     try:
-        if report_type not in ["funnel", "revenue", "performance", "behavior"]:
-            raise HTTPException(status_code=400, detail="Invalid report_type")
-        
-        if format not in ["json", "csv"]:
-            raise HTTPException(status_code=400, detail="Invalid format")
-        
-        # Parse dates if provided
-        parsed_start = None
-        parsed_end = None
-        
-        if start_date:
-            parsed_start = datetime.strptime(start_date, "%Y-%m-%d")
-        if end_date:
-            parsed_end = datetime.strptime(end_date, "%Y-%m-%d")
-        
-        analytics = AdvancedAnalyticsService(db)
-        
-        # Get the appropriate data based on report type
-        if report_type == "funnel":
-            data = analytics.get_conversion_funnel(parsed_start, parsed_end)
-        elif report_type == "revenue":
-            data = analytics.get_revenue_analytics(parsed_start, parsed_end)
-        elif report_type == "performance":
-            data = analytics.get_destination_performance(parsed_start, parsed_end)
-        else:  # behavior
-            data = analytics.get_user_behavior_analytics(parsed_start, parsed_end)
+        cache_key = build_cache_key("advanced-analytics:export", {
+            "report_type": report_type,
+            "start_date": start_date,
+            "end_date": end_date
+        })
+        data = cache_get(cache_key)
+        
+        if data is None:
+            # Get the appropriate data based on report type
+            if report_type == "funnel":
+                data = analytics.get_conversion_funnel(start_date, end_date)
+            elif report_type == "revenue":
+                data = analytics.get_revenue_analytics(start_date, end_date)
+            elif report_type == "performance":
+                data = analytics.get_destination_performance(start_date, end_date)
+            else:  # behavior
+                data = analytics.get_user_behavior_analytics(start_date, end_date)
+            
+            if data:
+                cache_set(cache_key, data, _EXPORT_CACHE_TTL)
         
         if format == "json":
             return {
@@ -389,21 +361,15 @@ async def export_analytics_data(
                 "report_type": report_type,
                 "format": format,
                 "data": data,
-                "exported_at": datetime.now().isoformat()
+                "exported_at": datetime.now()
             }
         else:
-            # For CSV format, we would normally return a CSV response
-            # For now, return a note about CSV implementation
-            return {
-                "success": True,
-                "report_type": report_type,
-                "format": format,
-                "note": "CSV export functionality would be implemented here",
-                "data_available": True,
-                "exported_at": datetime.now().isoformat()
-            }
+            filename = f"{report_type}_{datetime.now().strftime('%Y%m%d')}.csv"
+            return StreamingResponse(
+                _iter_csv(_CSV_ROW_ADAPTERS[report_type](data)),
+                media_type="text/csv",
+                headers={"Content-Disposition": f"attachment; filename={filename}"}
+            )
         
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid date format: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error exporting analytics data: {str(e)}")
\ No newline at end of file
@@ -1,28 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
+from celery.result import AsyncResult
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session, joinedload, raiseload
+from typing import List, Optional, Dict, Any, Sequence, Tuple
+from datetime import datetime, timedelta
+import asyncio
 import logging
+import numpy as np
 
-from app.core.database import get_db
+from app.core.cache import cached_response
+from app.core.database import SessionLocal, get_db
+from app.core.http_cache import http_cache
 from app.models.schemas import ClusteringResult, GroupSummary
-from app.tasks import cluster_interests, optimize_existing_groups
+from app.tasks import (
+    cluster_interests, optimize_existing_groups, _calculate_compatibility_matrix,
+    _calculate_average_compatibility, _optimize_group_membership,
+    clear_clustering_lock, queue_destination_clustering
+)
 from app.models.models import Group, Interest, Destination
+from app.worker import celery_app
 from app.api.v1.endpoints.auth import get_current_admin_user
+from app.core.token_cache import AdminPrincipal
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 logger = logging.getLogger(__name__)
 
 
+def _execute_with_session(statements: Sequence[Tuple[Any, bool]]) -> List[Any]:
+    """
+    Execute (statement, scalar) pairs in order on one dedicated session (safe to call from a worker thread).
+
+    A request holds a single pooled connection however many aggregates it runs,
+    so it never takes more than its share of DB_POOL_SIZE + DB_MAX_OVERFLOW.
+    """
+    db = SessionLocal()
+    try:
+        results = []
+        for statement, scalar in statements:
+            result = db.execute(statement)
+            results.append(result.scalar() if scalar else result.all())
+        return results
+    finally:
+        db.close()
+
+
 @router.post("/trigger", response_model=Dict[str, Any])
-async def trigger_clustering(
-    background_tasks: BackgroundTasks,
+def trigger_clustering(
     destination_id: Optional[int] = None,
     force: bool = False,
-    admin: dict = Depends(get_current_admin_user),
+    admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """
-    Manually trigger interest clustering for all destinations or a specific destination
+    Manually trigger interest clustering for all destinations or a specific destination.
+    The job runs on the Celery clustering queue; poll /clustering/jobs/{job_id} for its state.
     """
     try:
         if destination_id:
@@ -31,43 +63,52 @@ async def trigger_clustering(
             if not destination:
                 raise HTTPException(status_code=404, detail="Destination not found")
             
+            # Single-flight per destination; force drops a stuck or in-flight claim
+            if force:
+                clear_clustering_lock(destination_id)
+            
             # Trigger clustering for specific destination
-            background_tasks.add_task(cluster_interests)
+            job_id = queue_destination_clustering(destination_id)
+            if job_id is None:
+                raise HTTPException(status_code=409, detail="Clustering is already queued or running for this destination")
             
             return {
                 "message": f"Clustering triggered for destination {destination.name}",
                 "destination_id": destination_id,
-                "triggered_by": admin.get("username", "admin")
+                "job_id": job_id,
+                "triggered_by": admin.email
             }
         else:
-            # Trigger clustering for all destinations
-            background_tasks.add_task(cluster_interests)
+            # Fans out one job per destination, skipping destinations already in flight
+            job = cluster_interests.apply_async()
             
             return {
                 "message": "Clustering triggered for all destinations",
-                "triggered_by": admin.get("username", "admin")
+                "job_id": job.id,
+                "triggered_by": admin.email
             }
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error triggering clustering: {e}")
         raise HTTPException(status_code=500, detail="Failed to trigger clustering")
 
 
 @router.post("/optimize", response_model=Dict[str, Any])
-async def trigger_group_optimization(
-    background_tasks: BackgroundTasks,
-    admin: dict = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+def trigger_group_optimization(
+    admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """
-    Manually trigger group optimization (merging, member addition)
+    Manually trigger group optimization (merging, member addition) on the Celery clustering queue
     """
     try:
-        background_tasks.add_task(optimize_existing_groups)
+        job = optimize_existing_groups.apply_async()
         
         return {
             "message": "Group optimization triggered",
-            "triggered_by": admin.get("username", "admin")
+            "job_id": job.id,
+            "triggered_by": admin.email
         }
         
     except Exception as e:
@@ -75,50 +116,89 @@ async def trigger_group_optimization(
         raise HTTPException(status_code=500, detail="Failed to trigger group optimization")
 
 
+@router.get("/jobs/{job_id}", response_model=Dict[str, Any])
+def get_clustering_job(
+    job_id: str,
+    admin: AdminPrincipal = Depends(get_current_admin_user)
+):
+    """
+    Get the state (PENDING/STARTED/SUCCESS/FAILURE/...) of a clustering or optimization job
+    """
+    job = AsyncResult(job_id, app=celery_app)
+    return {
+        "job_id": job_id,
+        "status": job.status,
+        "error": str(job.result) if job.failed() else None
+    }
+
+
 @router.get("/status", response_model=Dict[str, Any])
-async def get_clustering_status(
+@http_cache(max_age=10, stale_while_revalidate=30)
+@cached_response("clustering:status", expire=10, exclude=("admin",), stale_expire=300)
+def get_clustering_status(
     destination_id: Optional[int] = None,
-    admin: dict = Depends(get_current_admin_user),
+    admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """
     Get clustering status and statistics
     """
     try:
-        # Base query for interests
-        interests_query = db.query(Interest)
-        groups_query = db.query(Group)
-        
+        interest_filters = []
+        group_filters = []
         if destination_id:
-            interests_query = interests_query.filter(Interest.destination_id == destination_id)
-            groups_query = groups_query.filter(Group.destination_id == destination_id)
-        
-        # Get statistics
-        total_interests = interests_query.count()
-        open_interests = interests_query.filter(Interest.status == 'open').count()
-        matched_interests = interests_query.filter(Interest.status == 'matched').count()
-        
-        total_groups = groups_query.count()
-        forming_groups = groups_query.filter(Group.status == 'forming').count()
-        confirmed_groups = groups_query.filter(Group.status == 'confirmed').count()
+            interest_filters.append(Interest.destination_id == destination_id)
+            group_filters.append(Group.destination_id == destination_id)
+        
+        # Get statistics: one aggregate query per table
+        interest_counts = db.query(
+            func.count(Interest.id).label('total'),
+            func.count(case((Interest.status == 'open', 1))).label('open'),
+            func.count(case((Interest.status == 'matched', 1))).label('matched')
+        ).filter(*interest_filters).one()
+        
+        group_counts = db.query(
+            func.count(Group.id).label('total'),
+            func.count(case((Group.status == 'forming', 1))).label('forming'),
+            func.count(case((Group.status == 'confirmed', 1))).label('confirmed')
+        ).filter(*group_filters).one()
+        
+        total_interests = interest_counts.total
+        open_interests = interest_counts.open
+        matched_interests = interest_counts.matched
+        
+        total_groups = group_counts.total
+        forming_groups = group_counts.forming
+        confirmed_groups = group_counts.confirmed
         
         # Calculate clustering efficiency
         clustering_efficiency = (matched_interests / total_interests * 100) if total_interests > 0 else 0
         
-        # Get recent groups
-        recent_groups = groups_query.order_by(Group.created_at.desc()).limit(5).all()
+        # Get recent groups as plain rows (only the columns the summary needs)
+        recent_groups = db.query(
+            Group.id,
+            Group.name,
+            Destination.name.label('destination_name'),
+            Group.current_size,
+            Group.status,
+            Group.final_price_per_person,
+            (Group.base_price - Group.final_price_per_person).label('savings'),
+            Group.created_at
+        ).join(Destination, Group.destination_id == Destination.id).filter(
+            *group_filters
+        ).order_by(Group.created_at.desc()).limit(5).all()
         
         group_summaries = []
         for group in recent_groups:
             group_summaries.append({
                 "id": group.id,
                 "name": group.name,
-                "destination_name": group.destination.name,
+                "destination_name": group.destination_name,
                 "current_size": group.current_size,
                 "status": group.status,
                 "final_price": group.final_price_per_person,
-                "savings": group.base_price - group.final_price_per_person,
-                "created_at": group.created_at.isoformat()
+                "savings": group.savings,
+                "created_at": group.created_at
             })
         
         return {
@@ -141,35 +221,30 @@ async def get_clustering_status(
 
 
 @router.get("/groups/{group_id}/details", response_model=Dict[str, Any])
-async def get_group_details(
+def get_group_details(
     group_id: int,
-    admin: dict = Depends(get_current_admin_user),
+    admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """
     Get detailed information about a specific group including member compatibility
     """
     try:
-        group = db.query(Group).filter(Group.id == group_id).first()
+        group = db.query(Group).options(
+            joinedload(Group.destination)
+        ).filter(Group.id == group_id).first()
         if not group:
             raise HTTPException(status_code=404, detail="Group not found")
         
-        # Get group members
-        members = db.query(Interest).filter(Interest.group_id == group_id).all()
+        # Get group members; details only read scalar columns, so forbid lazy loads
+        members = db.query(Interest).options(
+            raiseload("*")
+        ).filter(Interest.group_id == group_id).all()
         
-        # Calculate member compatibility matrix
-        compatibility_matrix = {}
-        for i, member1 in enumerate(members):
-            for j, member2 in enumerate(members):
-                if i != j:
-                    # Import compatibility function
-                    from app.tasks import _calculate_compatibility
-                    compatibility_score = _calculate_compatibility(member1, member2)
-                    key = f"{member1.id}-{member2.id}"
-                    compatibility_matrix[key] = round(compatibility_score, 3)
-        
-        # Calculate average compatibility
-        avg_compatibility = sum(compatibility_matrix.values()) / len(compatibility_matrix) if compatibility_matrix else 0
+        # Stored by the clustering tasks and cleared by other membership changes; score on the fly when unset
+        avg_compatibility = group.avg_compatibility
+        if avg_compatibility is None:
+            avg_compatibility = _calculate_average_compatibility(members)
         
         member_details = []
         for member in members:
@@ -178,12 +253,12 @@ async def get_group_details(
                 "user_name": member.user_name,
                 "user_email": member.user_email,
                 "num_people": member.num_people,
-                "date_from": member.date_from.isoformat(),
-                "date_to": member.date_to.isoformat(),
+                "date_from": member.date_from,
+                "date_to": member.date_to,
                 "budget_min": member.budget_min,
                 "budget_max": member.budget_max,
                 "special_requests": member.special_requests,
-                "created_at": member.created_at.isoformat()
+                "created_at": member.created_at
             })
         
         return {
@@ -195,32 +270,72 @@ async def get_group_details(
                 "current_size": group.current_size,
                 "min_size": group.min_size,
                 "max_size": group.max_size,
-                "date_from": group.date_from.isoformat(),
-                "date_to": group.date_to.isoformat(),
+                "date_from": group.date_from,
+                "date_to": group.date_to,
                 "base_price": group.base_price,
                 "final_price_per_person": group.final_price_per_person,
                 "price_calc": group.price_calc,
                 "admin_notes": group.admin_notes,
-                "created_at": group.created_at.isoformat()
+                "created_at": group.created_at
             },
             "members": member_details,
             "compatibility_analysis": {
                 "average_compatibility": round(avg_compatibility, 3),
-                "compatibility_matrix": compatibility_matrix,
                 "group_quality": "High" if avg_compatibility > 0.8 else "Medium" if avg_compatibility > 0.6 else "Low"
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting group details: {e}")
         raise HTTPException(status_code=500, detail="Failed to get group details")
 
 
+@router.get("/groups/{group_id}/compatibility-matrix", response_model=Dict[str, Any])
+def get_group_compatibility_matrix(
+    group_id: int,
+    admin: AdminPrincipal = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the pairwise compatibility matrix for a group's members
+    """
+    try:
+        if not db.query(Group.id).filter(Group.id == group_id).first():
+            raise HTTPException(status_code=404, detail="Group not found")
+        
+        # Compatibility scoring only reads scalar columns, so forbid lazy loads
+        members = db.query(Interest).options(
+            raiseload("*")
+        ).filter(Interest.group_id == group_id).all()
+        
+        # Calculate member compatibility matrix in one vectorized pass
+        scores = np.round(_calculate_compatibility_matrix(members), 3)
+        rows, cols = np.triu_indices(len(members), k=1)
+        
+        compatibility_matrix = {}
+        member_ids = [member.id for member in members]
+        for i, j, compatibility_score in zip(rows.tolist(), cols.tolist(), scores[rows, cols].tolist()):
+            compatibility_matrix[f"{member_ids[i]}-{member_ids[j]}"] = compatibility_score
+            compatibility_matrix[f"{member_ids[j]}-{member_ids[i]}"] = compatibility_score
+        
+        return {
+            "group_id": group_id,
+            "compatibility_matrix": compatibility_matrix
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting compatibility matrix for group {group_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get compatibility matrix")
+
+
 @router.put("/groups/{group_id}/optimize", response_model=Dict[str, Any])
-async def optimize_specific_group(
+def optimize_specific_group(
     group_id: int,
-    background_tasks: BackgroundTasks,
-    admin: dict = Depends(get_current_admin_user),
+    admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -234,9 +349,7 @@ async def optimize_specific_group(
         if group.status != 'forming':
             raise HTTPException(status_code=400, detail="Can only optimize forming groups")
         
-        # Import and run optimization function
-        from app.tasks import _optimize_group_membership
-        
+        # Run optimization function
         original_size = group.current_size
         _optimize_group_membership(db, group)
         db.commit()
@@ -250,9 +363,11 @@ async def optimize_specific_group(
             "original_size": original_size,
             "new_size": new_size,
             "members_added": added_members,
-            "optimized_by": admin.get("username", "admin")
+            "optimized_by": admin.email
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error optimizing group {group_id}: {e}")
         db.rollback()
@@ -260,53 +375,65 @@ async def optimize_specific_group(
 
 
 @router.get("/analytics", response_model=Dict[str, Any])
+@http_cache(max_age=60, stale_while_revalidate=300)
+@cached_response("clustering:analytics", expire=60, exclude=("admin",), stale_expire=900)
 async def get_clustering_analytics(
     days: int = 30,
-    admin: dict = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """
     Get clustering analytics for the specified time period
     """
     try:
-        from datetime import datetime, timedelta
-        
         start_date = datetime.utcnow() - timedelta(days=days)
         
         # Groups created in time period
-        groups_created = db.query(Group).filter(Group.created_at >= start_date).count()
+        groups_created_query = select(func.count(Group.id)).where(Group.created_at >= start_date)
         
         # Interests matched in time period
-        interests_matched = db.query(Interest).filter(
+        interests_matched_query = select(func.count(Interest.id)).where(
             Interest.status == 'matched',
             Interest.updated_at >= start_date
-        ).count()
-        
-        # Calculate average group size
-        avg_group_size_result = db.query(
-            db.func.avg(Group.current_size)
-        ).filter(Group.created_at >= start_date).scalar()
-        
-        avg_group_size = float(avg_group_size_result) if avg_group_size_result else 0
+        )
         
-        # Calculate average savings per person
-        avg_savings_result = db.query(
-            db.func.avg(Group.base_price - Group.final_price_per_person)
-        ).filter(Group.created_at >= start_date).scalar()
+        # Average group size
+        avg_group_size_query = select(func.avg(Group.current_size)).where(Group.created_at >= start_date)
         
-        avg_savings = float(avg_savings_result) if avg_savings_result else 0
+        # Average savings per person
+        avg_savings_query = select(
+            func.avg(Group.base_price - Group.final_price_per_person)
+        ).where(Group.created_at >= start_date)
         
-        # Get top performing destinations
-        from sqlalchemy import func
-        top_destinations = db.query(
+        # Top performing destinations
+        top_destinations_query = select(
             Destination.name,
             func.count(Group.id).label('groups_count'),
             func.avg(Group.current_size).label('avg_size')
-        ).join(Group).filter(
+        ).join(Group).where(
             Group.created_at >= start_date
         ).group_by(Destination.name).order_by(
             func.count(Group.id).desc()
-        ).limit(5).all()
+        ).limit(5)
+        
+        # One worker thread and one pooled connection for all five aggregates (off the event loop)
+        (
+            groups_created,
+            interests_matched,
+            avg_group_size_result,
+            avg_savings_result,
+            top_destinations
+        ) = await asyncio.to_thread(_execute_with_session, [
+            (groups_created_query, True),
+            (interests_matched_query, True),
+            (avg_group_size_query, True),
+            (avg_savings_query, True),
+            (top_destinations_query, False)
+        ])
+        
+        groups_created = groups_created or 0
+        interests_matched = interests_matched or 0
+        avg_group_size = float(avg_group_size_result) if avg_group_size_result else 0
+        avg_savings = float(avg_savings_result) if avg_savings_result else 0
         
         destination_stats = []
         for dest in top_destinations:
@@ -318,7 +445,7 @@ async def get_clustering_analytics(
         
         return {
             "period_days": days,
-            "start_date": start_date.isoformat(),
+            "start_date": start_date,
             "summary": {
                 "groups_created": groups_created,
                 "interests_matched": interests_matched,
@@ -337,7 +464,7 @@ async def get_clustering_analytics(
 # ===== TESTING ENDPOINTS =====
 
 @router.post("/simulate")
-async def simulate_clustering(
+def simulate_clustering(
     request: Dict[str, Any],
     db: Session = Depends(get_db)
 ):
@@ -347,8 +474,10 @@ async def simulate_clustering(
         min_group_size = request.get('min_group_size', 4)
         max_group_size = request.get('max_group_size', 8)
         
-        # Get open interests for destination
-        interests = db.query(Interest).filter(
+        # Get open interests for destination, with the destination name in the same query
+        interests = db.query(
+            Interest.id, Interest.date_from, Interest.date_to, Destination.name.label('destination_name')
+        ).join(Destination).filter(
             Interest.destination_id == destination_id,
             Interest.status == 'open'
         ).all()
@@ -362,26 +491,23 @@ async def simulate_clustering(
         
         # Simple grouping for testing - create one group
         group_interests = interests[:max_group_size]
+        destination_name = interests[0].destination_name
         
         # Create group
-        destination = db.query(Destination).filter(Destination.id == destination_id).first()
-        if not destination:
-            destination_name = f"Test Destination {destination_id}"
-        else:
-            destination_name = destination.name
-        
-        from datetime import datetime, timedelta
-        import uuid
-        
+        now = datetime.utcnow()
         group = Group(
-            name=f"Test Group {destination_name} - {datetime.now().strftime('%Y%m%d-%H%M')}",
+            name=f"Test Group {destination_name} - {now.strftime('%Y%m%d-%H%M')}",
             destination_id=destination_id,
+            date_from=min(interest.date_from for interest in group_interests),
+            date_to=max(interest.date_to for interest in group_interests),
             status='forming',
             min_size=min_group_size,
             max_size=max_group_size,
-            price_per_person=40000.0,
-            confirmation_deadline=datetime.utcnow() + timedelta(days=3),
-            created_at=datetime.utcnow(),
+            current_size=len(group_interests),
+            base_price=40000.0,
+            final_price_per_person=40000.0,
+            confirmation_deadline=now + timedelta(days=3),
+            created_at=now,
             auto_confirm_enabled=True,
             minimum_confirmation_rate=0.75
         )
@@ -389,10 +515,10 @@ async def simulate_clustering(
         db.add(group)
         db.flush()
         
-        # Add interests to group
-        for interest in group_interests:
-            interest.status = 'matched'
-            interest.group_id = group.id
+        # Add interests to group in a single UPDATE
+        db.query(Interest).filter(
+            Interest.id.in_([interest.id for interest in group_interests])
+        ).update({"status": "matched", "group_id": group.id}, synchronize_session=False)
         
         db.commit()
         
@@ -1,18 +1,23 @@
 from typing import Dict, Any
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 
+from app.core.cache import cached_response
 from app.core.database import get_db
+from app.core.http_cache import http_cache
 from app.api.v1.endpoints.auth import get_current_admin_user
+from app.core.token_cache import AdminPrincipal
 from app.services.analytics_service import AnalyticsService
-from app.models.models import Traveler
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
 @router.get("/dashboard", response_model=Dict[str, Any])
+@http_cache(max_age=60, stale_while_revalidate=300)
+@cached_response("analytics:dashboard", expire=60, exclude=("current_admin",), stale_expire=900)
 def get_dashboard_analytics(
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get dashboard analytics (admin only)"""
@@ -23,7 +28,7 @@ def get_dashboard_analytics(
 @router.get("/interests", response_model=Dict[str, Any])
 def get_interest_analytics(
     days: int = Query(30, description="Number of days to analyze"),
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get interest trends and analytics (admin only)"""
@@ -34,7 +39,7 @@ def get_interest_analytics(
 @router.get("/conversion", response_model=Dict[str, Any])
 def get_conversion_analytics(
     days: int = Query(30, description="Number of days to analyze"),
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get conversion funnel analytics (admin only)"""
@@ -45,7 +50,7 @@ def get_conversion_analytics(
 @router.get("/groups", response_model=Dict[str, Any])
 def get_group_analytics(
     days: int = Query(30, description="Number of days to analyze"),
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get group formation analytics (admin only)"""
@@ -56,7 +61,7 @@ def get_group_analytics(
 @router.get("/revenue", response_model=Dict[str, Any])
 def get_revenue_analytics(
     days: int = Query(30, description="Number of days to analyze"),
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get revenue analytics (admin only)"""
@@ -66,7 +71,7 @@ def get_revenue_analytics(
 
 @router.get("/geographic", response_model=Dict[str, Any])
 def get_geographic_analytics(
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get geographic distribution analytics (admin only)"""
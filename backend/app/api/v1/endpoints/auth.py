@@ -5,6 +5,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
+from app.core.token_cache import AdminPrincipal, admin_tokens
 from app.services.auth_service import AuthService
 from app.models.schemas import UserCreate, User as UserSchema
 from app.models.models import Traveler
@@ -36,14 +37,39 @@ def get_current_user(
 
 
 # Dependency to get current admin user
-def get_current_admin_user(current_user: Traveler = Depends(get_current_user)) -> Traveler:
-    """Get current admin user"""
-    if not current_user.is_admin:
+def get_current_admin_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> AdminPrincipal:
+    """Get current admin user (recently verified admin tokens are served without touching the DB)"""
+    token = credentials.credentials
+    admin = admin_tokens.get(token)
+    if admin is not None:
+        return admin
+    
+    service = AuthService(db)
+    payload = service.verify_token(token)
+    user = service.get_user_by_email(payload["sub"]) if payload and payload.get("sub") else None
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
+        )
+    if not user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
-    return current_user
+    
+    admin = AdminPrincipal(user.id, user.email, user.name, True)
+    admin_tokens.put(token, admin, payload.get("exp"))
+    return admin
 
 
 @router.post("/login")
@@ -113,7 +139,7 @@ def read_users_me(current_user: Traveler = Depends(get_current_user)) -> Travele
 
 
 @router.get("/admin/verify")
-def verify_admin(current_admin: Traveler = Depends(get_current_admin_user)) -> dict[str, Any]:
+def verify_admin(current_admin: AdminPrincipal = Depends(get_current_admin_user)) -> dict[str, Any]:
     """Verify admin access"""
     return {
         "message": "Admin access verified",
@@ -1,52 +1,54 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.pagination import set_next_cursor
 from app.models import schemas
-from app.services.file_service import FileService
+from app.services.file_service import FileService, FileTooLargeError, sniff_upload
 from app.api.v1.endpoints.auth import get_current_admin_user
+from app.core.token_cache import AdminPrincipal
+import asyncio
 import os
 
 router = APIRouter()
 
+ALLOWED_IMAGE_TYPES = frozenset({"image/jpeg", "image/png", "image/webp", "image/jpg"})
+MAX_IMAGE_SIZE = 10 * 1024 * 1024  # 10MB
+GALLERY_UPLOAD_CONCURRENCY = 4
+
 
 @router.post("/upload/image", response_model=schemas.FileUploadResponse)
 async def upload_image(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_admin: schemas.User = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """Upload a single image file (admin only)"""
     service = FileService(db)
     
-    # Validate file type
-    allowed_types = ["image/jpeg", "image/png", "image/webp", "image/jpg"]
-    if file.content_type not in allowed_types:
+    # Validate file type: the declared type must be allowed and match the file's magic bytes
+    content_type = await sniff_upload(file)
+    if file.content_type not in ALLOWED_IMAGE_TYPES or content_type is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File type {file.content_type} not allowed. Allowed types: {', '.join(allowed_types)}"
+            detail=f"File type {file.content_type} not allowed. Allowed types: {', '.join(sorted(ALLOWED_IMAGE_TYPES))}"
         )
     
-    # Validate file size (max 10MB)
-    max_size = 10 * 1024 * 1024  # 10MB
-    file_content = await file.read()
-    if len(file_content) > max_size:
+    # Validate file size (max 10MB) while streaming the upload to disk
+    try:
+        return await service.upload_image(file, current_admin.id, content_type, max_size=MAX_IMAGE_SIZE)
+    except FileTooLargeError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="File size exceeds 10MB limit"
         )
-    
-    # Reset file pointer
-    await file.seek(0)
-    
-    return await service.upload_image(file, current_admin.id)
 
 
 @router.post("/upload/gallery", response_model=List[schemas.FileUploadResponse])
 async def upload_gallery_images(
     files: List[UploadFile] = File(...),
     db: Session = Depends(get_db),
-    current_admin: schemas.User = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """Upload multiple images for gallery (admin only)"""
     service = FileService(db)
@@ -57,43 +59,51 @@ async def upload_gallery_images(
             detail="Maximum 10 files allowed per upload"
         )
     
-    results = []
+    # Validate every file type (declared and sniffed) before writing anything
+    content_types = []
     for file in files:
-        # Validate file type
-        allowed_types = ["image/jpeg", "image/png", "image/webp", "image/jpg"]
-        if file.content_type not in allowed_types:
+        content_type = await sniff_upload(file)
+        if file.content_type not in ALLOWED_IMAGE_TYPES or content_type is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"File type {file.content_type} not allowed for {file.filename}"
             )
-        
+        content_types.append(content_type)
+    
+    # Upload concurrently; disk and PIL work run on worker threads, bounded to spare the disk
+    semaphore = asyncio.Semaphore(GALLERY_UPLOAD_CONCURRENCY)
+    
+    async def upload_one(file: UploadFile, content_type: str):
+        async with semaphore:
+            return await service.upload_image(file, current_admin.id, content_type, max_size=MAX_IMAGE_SIZE)
+    
+    results = await asyncio.gather(
+        *(upload_one(file, content_type) for file, content_type in zip(files, content_types)),
+        return_exceptions=True
+    )
+    
+    for file, result in zip(files, results):
         # Validate file size (max 10MB per file)
-        max_size = 10 * 1024 * 1024  # 10MB
-        file_content = await file.read()
-        if len(file_content) > max_size:
+        if isinstance(result, FileTooLargeError):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"File {file.filename} exceeds 10MB limit"
             )
-        
-        # Reset file pointer
-        await file.seek(0)
-        
-        result = await service.upload_image(file, current_admin.id)
-        results.append(result)
+        if isinstance(result, BaseException):
+            raise result
     
     return results
 
 
 @router.delete("/upload/{file_id}")
-async def delete_uploaded_file(
+def delete_uploaded_file(
     file_id: str,
     db: Session = Depends(get_db),
-    current_admin: schemas.User = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """Delete an uploaded file (admin only)"""
     service = FileService(db)
-    success = await service.delete_file(file_id, current_admin.id)
+    success = service.delete_file(file_id, current_admin.id)
     
     if not success:
         raise HTTPException(
@@ -105,20 +115,32 @@ async def delete_uploaded_file(
 
 
 @router.get("/upload/files", response_model=List[schemas.UploadedFile])
-async def get_uploaded_files(
+def get_uploaded_files(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     file_type: str = "image",
+    cursor: Optional[int] = Query(None, description="Return files with id below this (from X-Next-Cursor)"),
     db: Session = Depends(get_db),
-    current_admin: schemas.User = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """Get list of uploaded files (admin only)"""
     service = FileService(db)
-    return await service.get_files(skip=skip, limit=limit, file_type=file_type, user_id=current_admin.id)
+    files = service.get_files(skip=skip, limit=limit, file_type=file_type, user_id=current_admin.id, cursor=cursor)
+    set_next_cursor(response, files, limit)
+    return files
 
 
 # Document serving endpoints
-from fastapi.responses import FileResponse
+import mimetypes
+from typing import AsyncIterator, Tuple
+from stat import S_ISREG
+from urllib.parse import quote
+from fastapi import Request
+from fastapi.responses import FileResponse, StreamingResponse
+from app.core.config import settings
+from app.core.http_cache import etag_matches
+from app.core.token_cache import TokenPrincipal, traveler_tokens
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.models.models import Traveler
 from app.services.traveler_service import TravelerService
@@ -129,77 +151,182 @@ security = HTTPBearer()
 def get_current_traveler_or_admin(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> Traveler:
+) -> TokenPrincipal:
     """Get current authenticated traveler or admin"""
-    traveler_service = TravelerService(db)
-    traveler = traveler_service.get_current_traveler_from_token(credentials.credentials)
-    if not traveler:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials"
-        )
+    token = credentials.credentials
+    principal = traveler_tokens.get(token)
+    if principal is None:
+        payload = TravelerService.verify_token(token)
+        row = None
+        if payload and payload.get("sub"):
+            query = db.query(
+                Traveler.id, Traveler.is_active, Traveler.is_admin
+            ).filter(Traveler.email == payload["sub"])
+            if payload.get("traveler_id") is not None:
+                query = query.filter(Traveler.id == payload["traveler_id"])
+            row = query.first()
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials"
+            )
+        principal = TokenPrincipal(row.id, bool(row.is_active), bool(row.is_admin))
+        traveler_tokens.put(token, principal, payload.get("exp"))
     
-    if not traveler.is_active:
+    if not principal.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Inactive account"
         )
     
-    return traveler
+    return principal
 
 
-@router.get("/traveler_documents/{filename}")
-async def serve_traveler_document(
-    filename: str,
-    current_user: Traveler = Depends(get_current_traveler_or_admin),
-    db: Session = Depends(get_db)
-):
-    """Serve traveler document files (authenticated users only)"""
-    file_path = f"/app/uploads/traveler_documents/{filename}"
+DOCUMENTS_ROOT = "/app/uploads"
+
+
+DOCUMENT_CACHE_CONTROL = "private, max-age=300"
+DOCUMENT_CHUNK_SIZE = 64 * 1024
+
+
+def _parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=start-end` / `bytes=-suffix` Range into inclusive offsets.
+
+    Returns None for ranges we serve as a full response instead (multiple
+    ranges, other units, malformed values). The result may be unsatisfiable
+    (start > end or start >= size); the caller answers that with a 416.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_text, separator, end_text = spec.strip().partition("-")
+    if not separator:
+        return None
+    try:
+        if start_text:
+            start = int(start_text)
+            end = min(int(end_text), size - 1) if end_text else size - 1
+        else:
+            suffix_length = int(end_text)
+            start = max(size - suffix_length, 0) if suffix_length > 0 else size
+            end = size - 1
+    except ValueError:
+        return None
+    return start, end
+
+
+async def _iter_file_range(file_path: str, start: int, length: int) -> AsyncIterator[bytes]:
+    """Stream length bytes from start, doing the blocking file I/O in worker threads"""
+    file = await asyncio.to_thread(open, file_path, "rb")
+    try:
+        await asyncio.to_thread(file.seek, start)
+        while length > 0:
+            chunk = await asyncio.to_thread(file.read, min(DOCUMENT_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        await asyncio.to_thread(file.close)
+
+
+async def _serve_document(request: Request, directory: str, filename: str) -> Response:
+    """
+    Serve an uploaded document with conditional GET, single byte-range and HEAD
+    support, delegating the transfer to nginx when configured.
+    """
+    if os.path.basename(filename) != filename or filename in ("", ".", ".."):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
     
-    if not os.path.exists(file_path):
+    file_path = os.path.join(DOCUMENTS_ROOT, directory, filename)
+    
+    # stat() off the event loop; one call gives existence, type, and the ETag inputs
+    try:
+        stat_result = await asyncio.to_thread(os.stat, file_path)
+    except FileNotFoundError:
+        stat_result = None
+    if stat_result is None or not S_ISREG(stat_result.st_mode):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File not found"
         )
     
+    etag = f'W/"{int(stat_result.st_mtime)}-{stat_result.st_size}"'
+    headers = {"ETag": etag, "Cache-Control": DOCUMENT_CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    prefix = settings.DOCUMENT_ACCEL_REDIRECT_PREFIX
+    if prefix:
+        # nginx streams the file with sendfile and answers Range/HEAD itself; the worker only did the auth check
+        headers["X-Accel-Redirect"] = f"{prefix.rstrip('/')}/{directory}/{quote(filename)}"
+        return Response(headers=headers, media_type=media_type)
+    
+    headers["Accept-Ranges"] = "bytes"
+    size = stat_result.st_size
+    range_header = request.headers.get("range")
+    # A stale If-Range means the client's partial copy is outdated, so it gets the whole file
+    byte_range = None
+    if range_header and request.headers.get("if-range", etag) == etag:
+        byte_range = _parse_byte_range(range_header, size)
+    
+    if byte_range is not None:
+        start, end = byte_range
+        if start > end or start >= size:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, headers=headers)
+        
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        if request.method == "HEAD":
+            return Response(status_code=status.HTTP_206_PARTIAL_CONTENT, headers=headers, media_type=media_type)
+        return StreamingResponse(
+            _iter_file_range(file_path, start, end - start + 1),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            headers=headers,
+            media_type=media_type
+        )
+    
+    # FileResponse sends headers only for HEAD requests
+    return FileResponse(file_path, headers=headers, media_type=media_type, stat_result=stat_result)
+
+
+@router.get("/traveler_documents/{filename}")
+@router.head("/traveler_documents/{filename}")
+async def serve_traveler_document(
+    filename: str,
+    request: Request,
+    current_user: TokenPrincipal = Depends(get_current_traveler_or_admin)
+):
+    """Serve traveler document files (authenticated users only)"""
     # TODO: Add proper access control - check if user owns the document or is admin
-    return FileResponse(file_path)
+    return await _serve_document(request, "traveler_documents", filename)
 
 
 @router.get("/passenger_documents/{filename}")
+@router.head("/passenger_documents/{filename}")
 async def serve_passenger_document(
     filename: str,
-    current_user: Traveler = Depends(get_current_traveler_or_admin),
-    db: Session = Depends(get_db)
+    request: Request,
+    current_user: TokenPrincipal = Depends(get_current_traveler_or_admin)
 ):
     """Serve passenger document files (authenticated users only)"""
-    file_path = f"/app/uploads/passenger_documents/{filename}"
-    
-    if not os.path.exists(file_path):
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="File not found"
-        )
-    
     # TODO: Add proper access control - check if user owns the document or is admin
-    return FileResponse(file_path)
+    return await _serve_document(request, "passenger_documents", filename)
 
 
 @router.get("/travel_documents/{filename}")
+@router.head("/travel_documents/{filename}")
 async def serve_travel_document(
     filename: str,
-    current_user: Traveler = Depends(get_current_traveler_or_admin),
-    db: Session = Depends(get_db)
+    request: Request,
+    current_user: TokenPrincipal = Depends(get_current_traveler_or_admin)
 ):
     """Serve travel document files (authenticated users only)"""
-    file_path = f"/app/uploads/travel_documents/{filename}"
-    
-    if not os.path.exists(file_path):
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="File not found"
-        )
-    
     # TODO: Add proper access control - check if document is public or user has access
-    return FileResponse(file_path)
\ No newline at end of file
+    return await _serve_document(request, "travel_documents", filename)
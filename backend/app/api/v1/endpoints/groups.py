@@ -4,14 +4,15 @@ Provides CRUD operations for travel groups with admin authentication.
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from datetime import datetime
 
 from app.core.database import get_db
+from app.core.pagination import set_next_cursor
 from app.api.v1.endpoints.auth import get_current_admin_user
-from app.models.models import Traveler
-from app.models.schemas import Group, GroupCreate
+from app.core.token_cache import AdminPrincipal
+from app.models.schemas import Group, GroupCreate, GroupUpdate
 from app.services.group_service import GroupService
 
 router = APIRouter()
@@ -19,34 +20,39 @@ router = APIRouter()
 
 @router.get("/", response_model=List[Group])
 async def get_groups(
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of groups to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of groups to return"),
+    cursor: Optional[int] = Query(None, description="Return groups with id below this (from X-Next-Cursor)"),
     destination_id: Optional[int] = Query(None, description="Filter by destination"),
     status: Optional[str] = Query(None, description="Filter by status"),
     date_from: Optional[datetime] = Query(None, description="Filter groups starting from this date"),
     date_to: Optional[datetime] = Query(None, description="Filter groups ending before this date"),
     db: Session = Depends(get_db),
-    current_admin: Traveler = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """
     Get groups with optional filtering.
     Requires admin authentication.
     """
-    return GroupService.get_groups(
+    groups = GroupService.get_groups(
         db=db,
         skip=skip,
         limit=limit,
         destination_id=destination_id,
         status=status,
         date_from=date_from,
-        date_to=date_to
+        date_to=date_to,
+        cursor=cursor
     )
+    set_next_cursor(response, groups, limit)
+    return groups
 
 
 @router.get("/statistics")
 async def get_group_statistics(
     db: Session = Depends(get_db),
-    current_admin: Traveler = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """
     Get overall group statistics for admin dashboard.
@@ -59,7 +65,7 @@ async def get_group_statistics(
 async def get_group(
     group_id: int,
     db: Session = Depends(get_db),
-    current_admin: Traveler = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """
     Get a specific group by ID.
@@ -78,7 +84,7 @@ async def get_group(
 async def create_group(
     group_data: GroupCreate,
     db: Session = Depends(get_db),
-    current_admin: Traveler = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """
     Create a new group.
@@ -96,16 +102,16 @@ async def create_group(
 @router.put("/{group_id}", response_model=Group)
 async def update_group(
     group_id: int,
-    update_data: dict,
+    update_data: GroupUpdate,
     db: Session = Depends(get_db),
-    current_admin: Traveler = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """
     Update an existing group.
     Allows manual pricing overrides and status changes.
     Requires admin authentication.
     """
-    group = GroupService.update_group(db, group_id, update_data)
+    group = GroupService.update_group(db, group_id, update_data.model_dump(exclude_unset=True))
     if not group:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -118,7 +124,7 @@ async def update_group(
 async def delete_group(
     group_id: int,
     db: Session = Depends(get_db),
-    current_admin: Traveler = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """
     Delete a group and unlink associated interests.
@@ -136,7 +142,7 @@ async def delete_group(
 async def confirm_group(
     group_id: int,
     db: Session = Depends(get_db),
-    current_admin: Traveler = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """
     Confirm a group (change status to confirmed).
@@ -157,7 +163,7 @@ async def cancel_group(
     group_id: int,
     reason: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_admin: Traveler = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """
     Cancel a group and unlink members.
@@ -177,7 +183,7 @@ async def cancel_group(
 async def get_group_members(
     group_id: int,
     db: Session = Depends(get_db),
-    current_admin: Traveler = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """
     Get all members (interests) in a group.
@@ -205,7 +211,7 @@ async def add_member_to_group(
     group_id: int,
     interest_id: int,
     db: Session = Depends(get_db),
-    current_admin: Traveler = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """
     Manually add an interest to a group.
@@ -225,7 +231,7 @@ async def remove_member_from_group(
     group_id: int,
     interest_id: int,
     db: Session = Depends(get_db),
-    current_admin: Traveler = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """
     Remove an interest from a group.
@@ -244,7 +250,7 @@ async def remove_member_from_group(
 async def bulk_recalculate_pricing(
     destination_id: Optional[int] = Query(None, description="Recalculate for specific destination only"),
     db: Session = Depends(get_db),
-    current_admin: Traveler = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """
     Bulk recalculate pricing for all active groups.
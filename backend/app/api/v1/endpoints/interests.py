@@ -1,11 +1,12 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Response
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.pagination import set_next_cursor
 from app.models import schemas
-from app.models.models import Traveler
 from app.services.interest_service import InterestService
 from app.api.v1.endpoints.auth import get_current_admin_user
+from app.core.token_cache import AdminPrincipal
 from app.tasks import send_interest_confirmation
 
 router = APIRouter()
@@ -27,7 +28,7 @@ def create_interest(
     return created_interest
 
 
-@router.get("/", response_model=List[schemas.Interest])
+@router.get("/", response_model=List[schemas.Interest], response_model_exclude_none=True)
 def get_interests(
     destination_id: int = None,
     status: str = None,
@@ -60,23 +61,28 @@ def get_interest(
 
 # Admin-only endpoints
 
-@router.get("/admin/all", response_model=List[schemas.InterestWithDestination])
+@router.get("/admin/all", response_model=List[schemas.InterestWithDestination], response_model_exclude_none=True)
 def get_all_interests_admin(
+    response: Response,
     status: str = None,
     destination_id: int = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[int] = Query(None, description="Return interests with id below this (from X-Next-Cursor)"),
     db: Session = Depends(get_db),
-    current_admin: Traveler = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """Get all interests with destination details (admin only)"""
     service = InterestService(db)
-    return service.get_interests_with_destination(
+    interests = service.get_interests_with_destination(
         status=status,
         destination_id=destination_id,
         skip=skip,
-        limit=limit
+        limit=limit,
+        cursor=cursor
     )
+    set_next_cursor(response, interests, limit)
+    return interests
 
 
 @router.put("/admin/{interest_id}/status", response_model=schemas.Interest)
@@ -84,7 +90,7 @@ def update_interest_status_admin(
     interest_id: int,
     status_update: schemas.InterestStatusUpdate,
     db: Session = Depends(get_db),
-    current_admin: Traveler = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """Update interest status (admin only)"""
     service = InterestService(db)
@@ -97,7 +103,7 @@ def update_interest_status_admin(
 @router.get("/admin/stats", response_model=schemas.InterestStats)
 def get_interest_stats_admin(
     db: Session = Depends(get_db),
-    current_admin: Traveler = Depends(get_current_admin_user)
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
 ):
     """Get interest statistics (admin only)"""
     service = InterestService(db)
@@ -4,9 +4,9 @@ from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.api.v1.endpoints.auth import get_current_admin_user
+from app.core.token_cache import AdminPrincipal
 from app.services.page_service import PageService
 from app.models.schemas import Page as PageSchema, PageCreate, PageUpdate
-from app.models.models import Traveler
 
 router = APIRouter()
 
@@ -41,28 +41,25 @@ def get_page_by_slug(
 @router.post("/admin/", response_model=PageSchema)
 def create_page(
     page_data: PageCreate,
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Create a new page (admin only)"""
     service = PageService(db)
-    
-    # Check if slug already exists
-    existing_page = service.get_page_by_slug(page_data.slug)
-    if existing_page:
+    try:
+        return service.create_page(page_data)
+    except ValueError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Page with this slug already exists"
         )
-    
-    return service.create_page(page_data)
 
 
 @router.put("/admin/{page_id}", response_model=PageSchema)
 def update_page(
     page_id: int,
     page_data: PageUpdate,
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Update a page (admin only)"""
@@ -76,7 +73,7 @@ def update_page(
 @router.delete("/admin/{page_id}")
 def delete_page(
     page_id: int,
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Delete a page (admin only)"""
@@ -89,7 +86,7 @@ def delete_page(
 
 @router.post("/admin/create-defaults")
 def create_default_pages(
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Create default pages (Privacy Policy, Terms of Service, Contact Us)"""
@@ -1,6 +1,7 @@
 from typing import List
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
+from app.core.cache import SOCIAL_PROOF_CACHE, cached_response, invalidate_namespace
 from app.core.database import get_db
 from app.models import schemas
 from app.services.socialproof_service import SocialProofService
@@ -9,27 +10,32 @@ router = APIRouter()
 
 
 @router.get("/home", response_model=List[schemas.HomepageMessage])
-async def get_homepage_messages(
+@cached_response(f"{SOCIAL_PROOF_CACHE}:home", expire=60)
+def get_homepage_messages(
     limit: int = 5,
     db: Session = Depends(get_db)
 ):
     """Get social proof messages for homepage"""
     service = SocialProofService(db)
-    return await service.get_active_homepage_messages(limit=limit)
+    messages = service.get_homepage_messages(limit=limit)
+    return [schemas.HomepageMessage.model_validate(message).model_dump() for message in messages]
 
 
 @router.post("/messages", response_model=schemas.HomepageMessage)
-async def create_homepage_message(
+def create_homepage_message(
     message: schemas.HomepageMessageBase,
     db: Session = Depends(get_db)
 ):
     """Create new homepage message (admin only)"""
     service = SocialProofService(db)
-    return await service.create_homepage_message(message)
+    created = service.create_homepage_message(message.dict())
+    invalidate_namespace(SOCIAL_PROOF_CACHE)
+    return created
 
 
 @router.get("/trending")
-async def get_trending_destinations(
+@cached_response(f"{SOCIAL_PROOF_CACHE}:trending", expire=60)
+def get_trending_destinations(
     limit: int = 5,
     db: Session = Depends(get_db)
 ):
@@ -39,7 +45,8 @@ async def get_trending_destinations(
 
 
 @router.get("/activity")
-async def get_real_time_activity(
+@cached_response(f"{SOCIAL_PROOF_CACHE}:activity", expire=30)
+def get_real_time_activity(
     hours: int = 24,
     db: Session = Depends(get_db)
 ):
@@ -49,7 +56,7 @@ async def get_real_time_activity(
 
 
 @router.get("/destination/{destination_id}")
-async def get_destination_social_proof(
+def get_destination_social_proof(
     destination_id: int,
     db: Session = Depends(get_db)
 ):
@@ -59,18 +66,21 @@ async def get_destination_social_proof(
 
 
 @router.get("/smart-messages")
-async def get_smart_messages(
+@cached_response(f"{SOCIAL_PROOF_CACHE}:smart-messages", expire=60)
+def get_smart_messages(
     db: Session = Depends(get_db)
 ):
     """Get AI-generated smart social proof messages"""
     service = SocialProofService(db)
-    return service.generate_smart_messages()
+    cached = service.get_cached_payload("smart")
+    return cached if cached is not None else service.generate_smart_messages()
 
 
 @router.post("/generate-messages")
-async def generate_social_proof_messages(
+def generate_social_proof_messages(
     db: Session = Depends(get_db)
 ):
     """Generate and return social proof messages based on current data"""
     service = SocialProofService(db)
-    return service.generate_social_proof_messages()
\ No newline at end of file
+    cached = service.get_cached_payload("generated")
+    return cached if cached is not None else service.generate_social_proof_messages()
\ No newline at end of file
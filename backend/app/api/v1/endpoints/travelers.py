@@ -1,11 +1,16 @@
-from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from typing import List, Optional, Dict, Any, Iterator
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, UploadFile, File, Form
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+import logging
+import orjson
 
-from app.core.database import get_db
-from app.services.traveler_service import TravelerService
+from app.core.cache import DOCUMENT_STATS_CACHE, TRAVELER_STATS_CACHE, cached_response
+from app.core.database import SessionLocal, get_db
+from app.core.http_cache import not_modified, version_etag
+from app.services.traveler_service import InactiveTravelerError, TravelerService
 from app.services.traveler_document_service import TravelerDocumentService
 from app.models.schemas import (
     TravelerCreate, TravelerUpdate, TravelerProfile,
@@ -16,8 +21,12 @@ from app.models.schemas import (
 )
 from app.models.models import Traveler
 from app.api.v1.endpoints.auth import get_current_admin_user
+from app.core.token_cache import AdminPrincipal
+from app.worker import celery_app
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(default_response_class=ORJSONResponse)
 security = HTTPBearer()
 
 
@@ -26,22 +35,20 @@ def get_current_traveler(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> Traveler:
-    """Get current authenticated traveler"""
-    service = TravelerService(db)
-    traveler = service.get_current_traveler_from_token(credentials.credentials)
-    if not traveler:
+    """Get current authenticated (and active) traveler"""
+    try:
+        traveler = TravelerService.get_current_traveler_from_token(db, credentials.credentials)
+    except InactiveTravelerError:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Inactive account"
+        )
+    if traveler is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    if not traveler.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Inactive account"
-        )
-    
     return traveler
 
 
@@ -54,7 +61,7 @@ def register_traveler(
     """Register a new traveler"""
     service = TravelerService(db)
     traveler = service.register_traveler(traveler_data)
-    return TravelerProfile.from_orm(traveler)
+    return traveler
 
 
 @router.post("/login")
@@ -101,10 +108,13 @@ def login_traveler(
 # Traveler profile management
 @router.get("/profile", response_model=TravelerProfile)
 def get_traveler_profile(
+    request: Request,
+    response: Response,
     current_traveler: Traveler = Depends(get_current_traveler)
 ):
-    """Get current traveler's profile"""
-    return TravelerProfile.from_orm(current_traveler)
+    """Get current traveler's profile (304 when If-None-Match is current)"""
+    etag = version_etag(current_traveler.id, current_traveler.updated_at or current_traveler.created_at)
+    return not_modified(request, response, etag) or current_traveler
 
 
 @router.put("/profile", response_model=TravelerProfile)
@@ -116,7 +126,7 @@ def update_traveler_profile(
     """Update traveler profile"""
     service = TravelerService(db)
     updated_traveler = service.update_traveler_profile(current_traveler.id, update_data)
-    return TravelerProfile.from_orm(updated_traveler)
+    return updated_traveler
 
 
 @router.post("/change-password")
@@ -134,14 +144,20 @@ def change_password(
 
 @router.get("/interests", response_model=List[Interest])
 def get_traveler_interests(
+    request: Request,
+    response: Response,
     status: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
     current_traveler: Traveler = Depends(get_current_traveler),
     db: Session = Depends(get_db)
 ):
-    """Get traveler's interests"""
+    """Get traveler's interests (304 when If-None-Match is current)"""
     service = TravelerService(db)
+    version = service.get_traveler_interests_version(current_traveler.id, status)
+    cached = not_modified(request, response, version_etag(current_traveler.id, status, skip, limit, *version))
+    if cached:
+        return cached
     return service.get_traveler_interests(current_traveler.id, status, skip, limit)
 
 
@@ -162,8 +178,8 @@ def upload_traveler_document(
     document_type: str = Form(...),
     document_number: str = Form(...),
     document_name: Optional[str] = Form(None),
-    issue_date: Optional[str] = Form(None),
-    expiry_date: Optional[str] = Form(None),
+    issue_date: Optional[datetime] = Form(None),
+    expiry_date: Optional[datetime] = Form(None),
     issuing_authority: Optional[str] = Form(None),
     place_of_issue: Optional[str] = Form(None),
     current_traveler: Traveler = Depends(get_current_traveler),
@@ -171,16 +187,12 @@ def upload_traveler_document(
 ):
     """Upload a document for the current traveler"""
     
-    # Parse dates if provided
-    issue_dt = datetime.fromisoformat(issue_date) if issue_date else None
-    expiry_dt = datetime.fromisoformat(expiry_date) if expiry_date else None
-    
     document_data = TravelerDocumentCreate(
         document_type=document_type,
         document_number=document_number,
         document_name=document_name,
-        issue_date=issue_dt,
-        expiry_date=expiry_dt,
+        issue_date=issue_date,
+        expiry_date=expiry_date,
         issuing_authority=issuing_authority,
         place_of_issue=place_of_issue
     )
@@ -198,13 +210,19 @@ def upload_traveler_document(
 
 @router.get("/documents", response_model=List[TravelerDocument])
 def get_traveler_documents(
+    request: Request,
+    response: Response,
     document_type: Optional[str] = None,
     verified_only: bool = False,
     current_traveler: Traveler = Depends(get_current_traveler),
     db: Session = Depends(get_db)
 ):
-    """Get traveler's documents"""
+    """Get traveler's documents (304 when If-None-Match is current)"""
     service = TravelerDocumentService(db)
+    version = service.get_traveler_documents_version(current_traveler.id, document_type, verified_only)
+    cached = not_modified(request, response, version_etag(current_traveler.id, document_type, verified_only, *version))
+    if cached:
+        return cached
     return service.get_traveler_documents(current_traveler.id, document_type, verified_only)
 
 
@@ -229,14 +247,14 @@ def upload_passenger_document(
     document_number: str = Form(...),
     passenger_email: Optional[str] = Form(None),
     passenger_phone: Optional[str] = Form(None),
-    date_of_birth: Optional[str] = Form(None),
+    date_of_birth: Optional[datetime] = Form(None),
     gender: Optional[str] = Form(None),
     nationality: Optional[str] = Form("Indian"),
     relationship_type: Optional[str] = Form(None),
     interest_id: Optional[int] = Form(None),
     group_id: Optional[int] = Form(None),
-    issue_date: Optional[str] = Form(None),
-    expiry_date: Optional[str] = Form(None),
+    issue_date: Optional[datetime] = Form(None),
+    expiry_date: Optional[datetime] = Form(None),
     issuing_authority: Optional[str] = Form(None),
     place_of_issue: Optional[str] = Form(None),
     current_traveler: Traveler = Depends(get_current_traveler),
@@ -244,23 +262,18 @@ def upload_passenger_document(
 ):
     """Upload a document for a fellow passenger"""
     
-    # Parse dates if provided
-    dob_dt = datetime.fromisoformat(date_of_birth) if date_of_birth else None
-    issue_dt = datetime.fromisoformat(issue_date) if issue_date else None
-    expiry_dt = datetime.fromisoformat(expiry_date) if expiry_date else None
-    
     document_data = PassengerDocumentCreate(
         passenger_name=passenger_name,
         passenger_email=passenger_email,
         passenger_phone=passenger_phone,
-        date_of_birth=dob_dt,
+        date_of_birth=date_of_birth,
         gender=gender,
         nationality=nationality,
         relationship_type=relationship_type,
         document_type=document_type,
         document_number=document_number,
-        issue_date=issue_dt,
-        expiry_date=expiry_dt,
+        issue_date=issue_date,
+        expiry_date=expiry_date,
         issuing_authority=issuing_authority,
         place_of_issue=place_of_issue,
         interest_id=interest_id,
@@ -309,19 +322,44 @@ def get_all_travelers_admin(
     limit: int = 100,
     verified_only: bool = False,
     search: Optional[str] = None,
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get all travelers (admin only)"""
     service = TravelerService(db)
     travelers = service.get_all_travelers(skip, limit, verified_only, search)
-    return [TravelerProfile.from_orm(t) for t in travelers]
+    # Returned as ORM rows: FastAPI validates them once against response_model (from_attributes)
+    return travelers
+
+
+def _iter_travelers_ndjson(verified_only: bool, search: Optional[str]) -> Iterator[bytes]:
+    """Encode travelers one line at a time on a dedicated session (the request's session is closed before streaming)"""
+    db = SessionLocal()
+    try:
+        for traveler in TravelerService(db).iter_travelers(verified_only, search):
+            yield orjson.dumps(TravelerProfile.model_validate(traveler).model_dump()) + b"\n"
+    finally:
+        db.close()
+
+
+# Declared before /admin/travelers/{traveler_id} so "export" is not parsed as an id
+@router.get("/admin/travelers/export")
+def export_travelers_admin(
+    verified_only: bool = False,
+    search: Optional[str] = None,
+    current_admin: AdminPrincipal = Depends(get_current_admin_user)
+):
+    """Stream all matching travelers as newline-delimited JSON (admin only)"""
+    return StreamingResponse(
+        _iter_travelers_ndjson(verified_only, search),
+        media_type="application/x-ndjson"
+    )
 
 
 @router.get("/admin/travelers/{traveler_id}", response_model=TravelerProfile)
 def get_traveler_admin(
     traveler_id: int,
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get specific traveler details (admin only)"""
@@ -332,13 +370,13 @@ def get_traveler_admin(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Traveler not found"
         )
-    return TravelerProfile.from_orm(traveler)
+    return traveler
 
 
 @router.get("/admin/travelers/{traveler_id}/summary")
 def get_traveler_summary_admin(
     traveler_id: int,
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get traveler summary with interests and documents (admin only)"""
@@ -349,19 +387,19 @@ def get_traveler_summary_admin(
 @router.post("/admin/create-from-interest/{interest_id}", response_model=TravelerProfile)
 def create_traveler_from_interest(
     interest_id: int,
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Create traveler profile from interest after booking confirmation (admin only)"""
     service = TravelerService(db)
     traveler = service.admin_create_traveler_profile(interest_id, current_admin.id)
-    return TravelerProfile.from_orm(traveler)
+    return traveler
 
 
 @router.put("/admin/travelers/{traveler_id}/deactivate")
 def deactivate_traveler_admin(
     traveler_id: int,
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Deactivate traveler account (admin only)"""
@@ -378,7 +416,7 @@ def deactivate_traveler_admin(
 @router.put("/admin/travelers/{traveler_id}/reactivate")
 def reactivate_traveler_admin(
     traveler_id: int,
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Reactivate traveler account (admin only)"""
@@ -393,8 +431,9 @@ def reactivate_traveler_admin(
 
 
 @router.get("/admin/statistics")
+@cached_response(TRAVELER_STATS_CACHE, expire=30, exclude=("current_admin",))
 def get_traveler_statistics_admin(
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get traveler statistics (admin only)"""
@@ -406,7 +445,7 @@ def get_traveler_statistics_admin(
 @router.post("/admin/documents/verify")
 def verify_document_admin(
     verification_request: DocumentVerificationRequest,
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Verify or reject a document (admin only)"""
@@ -420,7 +459,7 @@ def verify_document_admin(
 def get_pending_verifications_admin(
     skip: int = 0,
     limit: int = 100,
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get all documents pending verification (admin only)"""
@@ -429,8 +468,9 @@ def get_pending_verifications_admin(
 
 
 @router.get("/admin/documents/statistics")
+@cached_response(DOCUMENT_STATS_CACHE, expire=30, exclude=("current_admin",))
 def get_document_statistics_admin(
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get document verification statistics (admin only)"""
@@ -447,33 +487,28 @@ def upload_travel_document_admin(
     traveler_id: Optional[int] = Form(None),
     group_id: Optional[int] = Form(None),
     destination_id: Optional[int] = Form(None),
-    travel_date: Optional[str] = Form(None),
-    validity_start: Optional[str] = Form(None),
-    validity_end: Optional[str] = Form(None),
+    travel_date: Optional[datetime] = Form(None),
+    validity_start: Optional[datetime] = Form(None),
+    validity_end: Optional[datetime] = Form(None),
     vendor_name: Optional[str] = Form(None),
     booking_reference: Optional[str] = Form(None),
     cost: Optional[float] = Form(None),
     currency: Optional[str] = Form("INR"),
     is_public: bool = Form(False),
     notes: Optional[str] = Form(None),
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Upload a travel document (admin only)"""
     
-    # Parse dates if provided
-    travel_dt = datetime.fromisoformat(travel_date) if travel_date else None
-    validity_start_dt = datetime.fromisoformat(validity_start) if validity_start else None
-    validity_end_dt = datetime.fromisoformat(validity_end) if validity_end else None
-    
     document_data = TravelDocumentCreate(
         group_id=group_id,
         destination_id=destination_id,
         document_type=document_type,
         document_title=document_title,
-        travel_date=travel_dt,
-        validity_start=validity_start_dt,
-        validity_end=validity_end_dt,
+        travel_date=travel_date,
+        validity_start=validity_start,
+        validity_end=validity_end,
         vendor_name=vendor_name,
         booking_reference=booking_reference,
         cost=cost,
@@ -489,26 +524,15 @@ def upload_travel_document_admin(
     if traveler_id:
         service.create_document_access(traveler_id, document.id, current_admin.id)
         
-        # Send notification to traveler about new document
-        from app.services.notification_service import NotificationService
-        from app.services.traveler_service import TravelerService
-        
-        traveler_service = TravelerService(db)
-        traveler = traveler_service.get_traveler_by_id(traveler_id)
-        
-        if traveler:
-            notification_service = NotificationService()
-            try:
-                notification_service.send_document_upload_notification(
-                    db=db,
-                    traveler=traveler,
-                    document_name=document_title,
-                    document_category=document_type,
-                    admin_name=current_admin.name or "Admin"
-                )
-            except Exception as e:
-                # Log the error but don't fail the upload
-                print(f"Failed to send notification: {e}")
+        # Queued by name so the web process does not import app.tasks (and its ML stack)
+        try:
+            celery_app.send_task(
+                "app.tasks.send_document_upload_notification",
+                args=[traveler_id, document_title, document_type, current_admin.name or "Admin"]
+            )
+        except Exception as e:
+            # The document is saved either way; a broker outage only costs the notification
+            logger.error(f"Failed to queue upload notification for traveler {traveler_id}: {e}")
     
     return DocumentUploadResponse(
         success=True,
@@ -523,7 +547,7 @@ def get_travel_documents_admin(
     group_id: Optional[int] = None,
     destination_id: Optional[int] = None,
     document_category: Optional[str] = None,
-    current_admin: Traveler = Depends(get_current_admin_user),
+    current_admin: AdminPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get travel documents (admin only)"""
@@ -3,12 +3,16 @@ Enhanced Social Proof API Endpoints
 Provides advanced social proof with A/B testing and personalization
 """
 
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, Depends, Query, Body
+from fastapi import APIRouter, Depends, Query, Body, Response
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from datetime import datetime
+from pydantic import BaseModel, Field
+from datetime import datetime, timezone
+import orjson
 
+from app.core.cache import SOCIAL_PROOF_CACHE, cached_response
 from app.core.database import get_db
 from app.services.enhanced_socialproof_service import (
     EnhancedSocialProofAnalytics,
@@ -16,19 +20,27 @@ from app.services.enhanced_socialproof_service import (
     UserSegment
 )
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Request strings -> enum members; unknown values fall back to a default instead of raising
+_VARIANT_BY_VALUE = {variant.value: variant for variant in SocialProofVariant}
+_SEGMENT_BY_VALUE = {segment.value: segment for segment in UserSegment}
+
+
+def get_analytics(db: Session = Depends(get_db)) -> EnhancedSocialProofAnalytics:
+    """Provide a request-scoped EnhancedSocialProofAnalytics bound to the request's session"""
+    return EnhancedSocialProofAnalytics(db)
 
 
 @router.get("/trending")
-async def get_trending_destinations(
+@cached_response(f"{SOCIAL_PROOF_CACHE}:enhanced-trending", expire=60, exclude=("analytics",))
+def get_trending_destinations(
     limit: int = Query(default=10, le=50),
     time_window: int = Query(default=7, description="Days to look back"),
-    db: Session = Depends(get_db)
+    analytics: EnhancedSocialProofAnalytics = Depends(get_analytics)
 ):
     """Get trending destinations based on recent interest activity"""
     
-    analytics = EnhancedSocialProofAnalytics(db)
-    
     trending_data = analytics.get_trending_destinations(
         limit=limit,
         time_window_days=time_window
@@ -42,26 +54,17 @@ async def get_trending_destinations(
 
 
 @router.get("/social-proof/{destination_id}")
-async def get_destination_social_proof(
+def get_destination_social_proof(
     destination_id: int,
     variant: Optional[str] = Query(default=None),
     user_segment: Optional[str] = Query(default=None),
-    db: Session = Depends(get_db)
+    analytics: EnhancedSocialProofAnalytics = Depends(get_analytics)
 ):
     """Get personalized social proof for a destination"""
     
-    analytics = EnhancedSocialProofAnalytics(db)
-    
     # Parse variant and user segment
-    try:
-        social_variant = SocialProofVariant(variant) if variant else SocialProofVariant.SOCIAL_FOCUSED
-    except ValueError:
-        social_variant = SocialProofVariant.SOCIAL_FOCUSED
-    
-    try:
-        segment = UserSegment(user_segment) if user_segment else UserSegment.FIRST_TIME_VISITOR
-    except ValueError:
-        segment = UserSegment.FIRST_TIME_VISITOR
+    social_variant = _VARIANT_BY_VALUE.get(variant, SocialProofVariant.SOCIAL_FOCUSED)
+    segment = _SEGMENT_BY_VALUE.get(user_segment, UserSegment.FIRST_TIME_VISITOR)
     
     social_proof_data = analytics.get_personalized_social_proof(
         destination_id=destination_id,
@@ -95,18 +98,13 @@ class BehavioralTriggerRequest(BaseModel):
 
 
 @router.post("/track-interaction")
-async def track_social_proof_interaction(
+def track_social_proof_interaction(
     interaction: SocialProofInteraction,
-    db: Session = Depends(get_db)
+    analytics: EnhancedSocialProofAnalytics = Depends(get_analytics)
 ):
     """Track user interactions with social proof elements for A/B testing"""
     
-    analytics = EnhancedSocialProofAnalytics(db)
-    
-    try:
-        variant = SocialProofVariant(interaction.variant)
-    except ValueError:
-        variant = SocialProofVariant.SOCIAL_FOCUSED
+    variant = _VARIANT_BY_VALUE.get(interaction.variant, SocialProofVariant.SOCIAL_FOCUSED)
     
     tracking_data = analytics.track_social_proof_interaction(
         user_id=interaction.user_id,
@@ -125,18 +123,13 @@ async def track_social_proof_interaction(
 
 
 @router.post("/personalized-message")
-async def get_personalized_social_proof(
+def get_personalized_social_proof(
     request: PersonalizationRequest,
-    db: Session = Depends(get_db)
+    analytics: EnhancedSocialProofAnalytics = Depends(get_analytics)
 ):
     """Get personalized social proof message based on user segment and behavior"""
     
-    analytics = EnhancedSocialProofAnalytics(db)
-    
-    try:
-        user_segment = UserSegment(request.user_segment)
-    except ValueError:
-        user_segment = UserSegment.FIRST_TIME_VISITOR
+    user_segment = _SEGMENT_BY_VALUE.get(request.user_segment, UserSegment.FIRST_TIME_VISITOR)
     
     # Get optimal variant for this user segment
     variant = analytics.get_personalized_variant(
@@ -161,14 +154,12 @@ async def get_personalized_social_proof(
 
 
 @router.post("/behavioral-triggers")
-async def get_behavioral_triggers(
+def get_behavioral_triggers(
     request: BehavioralTriggerRequest,
-    db: Session = Depends(get_db)
+    analytics: EnhancedSocialProofAnalytics = Depends(get_analytics)
 ):
     """Get behavioral triggers based on user session data"""
     
-    analytics = EnhancedSocialProofAnalytics(db)
-    
     triggers = analytics.get_behavioral_triggers(request.session_data)
     
     return {
@@ -179,47 +170,38 @@ async def get_behavioral_triggers(
 
 
 @router.get("/destinations/{destination_id}/real-time-metrics")
-async def get_destination_real_time_metrics(
+def get_destination_real_time_metrics(
     destination_id: int,
-    db: Session = Depends(get_db)
+    analytics: EnhancedSocialProofAnalytics = Depends(get_analytics)
 ):
     """Get real-time metrics for a specific destination"""
     
-    analytics = EnhancedSocialProofAnalytics(db)
     metrics = analytics._get_destination_metrics(destination_id)
     
     return {
         "destination_id": destination_id,
         "metrics": metrics,
-        "generated_at": analytics.db.bind.execute("SELECT NOW()").scalar().isoformat()
+        "generated_at": datetime.now(timezone.utc).isoformat()
     }
 
 
 @router.get("/destinations/{destination_id}/social-proof-variants")
-async def get_social_proof_variants(
+@cached_response(f"{SOCIAL_PROOF_CACHE}:variants", expire=60, exclude=("analytics",))
+def get_social_proof_variants(
     destination_id: int,
     user_segment: str = Query(default="first_time"),
-    db: Session = Depends(get_db)
+    analytics: EnhancedSocialProofAnalytics = Depends(get_analytics)
 ):
     """Get all social proof variants for a destination (for testing)"""
     
-    analytics = EnhancedSocialProofAnalytics(db)
-    
-    try:
-        segment = UserSegment(user_segment)
-    except ValueError:
-        segment = UserSegment.FIRST_TIME_VISITOR
-    
-    variants = {}
-    real_time_data = {}
+    segment = _SEGMENT_BY_VALUE.get(user_segment, UserSegment.FIRST_TIME_VISITOR)
     
-    for variant in SocialProofVariant:
-        message = analytics.generate_personalized_message(
-            destination_id=destination_id,
-            variant=variant,
-            real_time_data=real_time_data
-        )
-        variants[variant.value] = message
+    # Destination and metrics are fetched once and shared by every variant
+    variants = analytics.generate_personalized_messages_bulk(
+        destination_id=destination_id,
+        variants=list(SocialProofVariant),
+        real_time_data={}
+    )
     
     # Get recommended variant for this segment
     recommended_variant = analytics.get_personalized_variant(
@@ -236,58 +218,65 @@ async def get_social_proof_variants(
     }
 
 
+# Mock social proof performance figures (not yet backed by an analytics store); never mutated
+_MOCK_PERFORMANCE_DATA = {
+    "total_impressions": 15420,
+    "total_clicks": 2877,
+    "total_conversions": 542,
+    "overall_ctr": 0.186,
+    "overall_conversion_rate": 0.188,
+    "variant_performance": {
+        "urgency_focused": {
+            "impressions": 3855,
+            "clicks": 694,
+            "conversions": 125,
+            "ctr": 0.180,
+            "conversion_rate": 0.180
+        },
+        "social_focused": {
+            "impressions": 3901,
+            "clicks": 741,
+            "conversions": 148,
+            "ctr": 0.190,
+            "conversion_rate": 0.200
+        },
+        "benefit_focused": {
+            "impressions": 3832,
+            "clicks": 689,
+            "conversions": 132,
+            "ctr": 0.180,
+            "conversion_rate": 0.192
+        },
+        "deadline_focused": {
+            "impressions": 3832,
+            "clicks": 753,
+            "conversions": 137,
+            "ctr": 0.196,
+            "conversion_rate": 0.182
+        }
+    },
+    "best_performing_variant": "social_focused",
+    "confidence_level": 0.85
+}
+
+# The unfiltered default view is constant, so it is serialized once at import
+_DEFAULT_PERFORMANCE_DAYS = 30
+_DEFAULT_PERFORMANCE_PAYLOAD = orjson.dumps({"period_days": _DEFAULT_PERFORMANCE_DAYS, **_MOCK_PERFORMANCE_DATA})
+
+
 @router.get("/analytics/social-proof-performance")
-async def get_social_proof_performance(
+def get_social_proof_performance(
     destination_id: Optional[int] = Query(None),
-    days: int = Query(30, description="Number of days to analyze"),
-    db: Session = Depends(get_db)
+    days: int = Query(30, description="Number of days to analyze")
 ):
     """Get social proof performance analytics"""
     
-    analytics = EnhancedSocialProofAnalytics(db)
-    
     # This would normally query analytics database
     # For now, return mock performance data
-    performance_data = {
-        "period_days": days,
-        "total_impressions": 15420,
-        "total_clicks": 2877,
-        "total_conversions": 542,
-        "overall_ctr": 0.186,
-        "overall_conversion_rate": 0.188,
-        "variant_performance": {
-            "urgency_focused": {
-                "impressions": 3855,
-                "clicks": 694,
-                "conversions": 125,
-                "ctr": 0.180,
-                "conversion_rate": 0.180
-            },
-            "social_focused": {
-                "impressions": 3901,
-                "clicks": 741,
-                "conversions": 148,
-                "ctr": 0.190,
-                "conversion_rate": 0.200
-            },
-            "benefit_focused": {
-                "impressions": 3832,
-                "clicks": 689,
-                "conversions": 132,
-                "ctr": 0.180,
-                "conversion_rate": 0.192
-            },
-            "deadline_focused": {
-                "impressions": 3832,
-                "clicks": 753,
-                "conversions": 137,
-                "ctr": 0.196,
-                "conversion_rate": 0.182
-            }
-        },
-        "best_performing_variant": "social_focused",
-        "confidence_level": 0.85
-    }
+    if destination_id is None and days == _DEFAULT_PERFORMANCE_DAYS:
+        return Response(content=_DEFAULT_PERFORMANCE_PAYLOAD, media_type="application/json")
+    
+    performance_data = {"period_days": days, **_MOCK_PERFORMANCE_DATA}
     
     if destination_id:
         performance_data["destination_id"] = destination_id
@@ -295,21 +284,29 @@ async def get_social_proof_performance(
     return performance_data
 
 
-@router.get("/user-segments/classification")
-async def classify_user_segment(
-    session_duration: int = Query(..., description="Session duration in minutes"),
-    page_views: int = Query(..., description="Number of pages viewed"),
-    previous_visits: int = Query(0, description="Number of previous visits"),
-    budget_range: Optional[str] = Query(None, description="Budget range preference"),
-    travel_frequency: Optional[str] = Query(None, description="Travel frequency"),
-    group_size: int = Query(1, description="Typical group size")
-):
-    """Classify user into segment for personalized social proof"""
+_RECOMMENDED_MESSAGING = {
+    UserSegment.FIRST_TIME_VISITOR: "Welcome! See what others are booking",
+    UserSegment.RETURN_VISITOR: "Welcome back! Check out trending destinations",
+    UserSegment.HIGH_BUDGET: "Exclusive experiences with premium benefits",
+    UserSegment.BUDGET_CONSCIOUS: "Great value deals and group savings",
+    UserSegment.FREQUENT_TRAVELER: "New destinations and exclusive offers",
+    UserSegment.FAMILY_TRAVELER: "Family-friendly group adventures"
+}
+
+
+@lru_cache(maxsize=4096)
+def _classify_segment(
+    previous_visits: int,
+    budget_range: Optional[str],
+    travel_frequency: Optional[str],
+    group_size: int
+) -> UserSegment:
+    """Rule-based segment for a visitor; later rules take precedence"""
     
     # User segment classification logic
     if previous_visits == 0:
         segment = UserSegment.FIRST_TIME_VISITOR
-    elif previous_visits > 0:
+    else:
         segment = UserSegment.RETURN_VISITOR
     
     # Refine based on behavior patterns
@@ -324,6 +321,23 @@ async def classify_user_segment(
     if group_size >= 3:
         segment = UserSegment.FAMILY_TRAVELER
     
+    return segment
+
+
+@router.get("/user-segments/classification")
+def classify_user_segment(
+    session_duration: int = Query(..., description="Session duration in minutes"),
+    page_views: int = Query(..., description="Number of pages viewed"),
+    previous_visits: int = Query(0, description="Number of previous visits"),
+    budget_range: Optional[str] = Query(None, description="Budget range preference"),
+    travel_frequency: Optional[str] = Query(None, description="Travel frequency"),
+    group_size: int = Query(1, description="Typical group size")
+):
+    """Classify user into segment for personalized social proof"""
+    
+    # Only these thresholds matter to the rules, so clamping keeps the memo small
+    segment = _classify_segment(min(previous_visits, 6), budget_range, travel_frequency, min(group_size, 3))
+    
     return {
         "user_segment": segment.value,
         "classification_factors": {
@@ -334,12 +348,33 @@ async def classify_user_segment(
             "travel_frequency": travel_frequency,
             "group_size": group_size
         },
-        "recommended_messaging": {
-            UserSegment.FIRST_TIME_VISITOR: "Welcome! See what others are booking",
-            UserSegment.RETURN_VISITOR: "Welcome back! Check out trending destinations",
-            UserSegment.HIGH_BUDGET: "Exclusive experiences with premium benefits",
-            UserSegment.BUDGET_CONSCIOUS: "Great value deals and group savings",
-            UserSegment.FREQUENT_TRAVELER: "New destinations and exclusive offers",
-            UserSegment.FAMILY_TRAVELER: "Family-friendly group adventures"
-        }.get(segment, "Discover amazing travel experiences")
+        "recommended_messaging": _RECOMMENDED_MESSAGING.get(segment, "Discover amazing travel experiences")
+    }
+
+
+class SegmentClassificationInput(BaseModel):
+    previous_visits: int = 0
+    budget_range: Optional[str] = None
+    travel_frequency: Optional[str] = None
+    group_size: int = 1
+
+
+class SegmentClassificationBatch(BaseModel):
+    sessions: List[SegmentClassificationInput] = Field(..., max_length=1000)
+
+
+@router.post("/user-segments/classification/batch")
+def classify_user_segments_batch(batch: SegmentClassificationBatch):
+    """Classify many sessions in one call (same rules and memo as the single endpoint)"""
+    
+    return {
+        "user_segments": [
+            _classify_segment(
+                min(session.previous_visits, 6),
+                session.budget_range,
+                session.travel_frequency,
+                min(session.group_size, 3)
+            ).value
+            for session in batch.sessions
+        ]
     }
\ No newline at end of file
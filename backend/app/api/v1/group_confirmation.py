@@ -1,13 +1,37 @@
+import re
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session, joinedload
 from app.core.database import get_db
 from app.services.group_formation_service import GroupFormationWorkflow
 from app.models.models import GroupMemberConfirmation, Group, Interest
 from pydantic import BaseModel
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, timezone
+
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Tokens come from secrets.token_urlsafe(32) (43 URL-safe chars); anything else cannot exist
+_TOKEN_RE = re.compile(r"[A-Za-z0-9_-]{22,64}")
+
+
+def _require_well_formed_token(token: str) -> None:
+    """Reject malformed tokens with the same 404 as unknown ones, without a DB lookup"""
+    if not _TOKEN_RE.fullmatch(token):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Confirmation not found"
+        )
+
+
+def _has_expired(expires_at: Optional[datetime]) -> bool:
+    """Compare against an aware UTC now; timestamptz columns load aware, older rows may be naive UTC"""
+    if expires_at is None:
+        return False
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) > expires_at
 
-router = APIRouter()
 
 class ConfirmationResponse(BaseModel):
     confirmed: bool
@@ -22,7 +46,7 @@ class GroupConfirmationData(BaseModel):
     confirmed_members: int
     total_members: int
     price_per_person: float
-    confirmation_deadline: str
+    confirmation_deadline: Optional[str] = None
     deposit_amount: float
     itinerary_highlights: List[str]
     members: List[dict]
@@ -31,23 +55,27 @@ class ConfirmationStatus(BaseModel):
     id: int
     confirmed: Optional[bool]
     payment_status: str
-    expires_at: str
+    expires_at: Optional[str] = None
     decline_reason: Optional[str] = None
 
 class ConfirmationResult(BaseModel):
     group: GroupConfirmationData
     confirmation: ConfirmationStatus
 
-@router.get("/{group_id}/confirm/{token}")
-async def get_confirmation_details(
+@router.get("/{group_id}/confirm/{token}", responses={200: {"model": ConfirmationResult}})
+def get_confirmation_details(
     group_id: int,
     token: str,
     db: Session = Depends(get_db)
 ):
     """Get group confirmation details for a specific confirmation token"""
     
-    # Find the confirmation record
-    confirmation = db.query(GroupMemberConfirmation).filter(
+    _require_well_formed_token(token)
+    
+    # Find the confirmation record, with its group and destination joined in
+    confirmation = db.query(GroupMemberConfirmation).options(
+        joinedload(GroupMemberConfirmation.group).joinedload(Group.destination)
+    ).filter(
         GroupMemberConfirmation.group_id == group_id,
         GroupMemberConfirmation.confirmation_token == token
     ).first()
@@ -59,22 +87,28 @@ async def get_confirmation_details(
         )
     
     # Check if confirmation has expired (unless already responded)
-    if confirmation.confirmed is None and datetime.utcnow() > confirmation.expires_at:
+    if confirmation.confirmed is None and _has_expired(confirmation.expires_at):
         raise HTTPException(
             status_code=status.HTTP_410_GONE,
             detail="Confirmation has expired"
         )
     
     # Get group details
-    group = db.query(Group).filter(Group.id == group_id).first()
+    group = confirmation.group
     if not group:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Group not found"
         )
     
-    # Get all confirmations for this group to show member status
-    all_confirmations = db.query(GroupMemberConfirmation).filter(
+    # Every confirmation for this group with its member's name, in one round-trip
+    member_rows = db.query(
+        GroupMemberConfirmation.confirmed,
+        Interest.id,
+        Interest.user_name
+    ).outerjoin(
+        Interest, Interest.id == GroupMemberConfirmation.interest_id
+    ).filter(
         GroupMemberConfirmation.group_id == group_id
     ).all()
     
@@ -82,54 +116,53 @@ async def get_confirmation_details(
     members = []
     confirmed_count = 0
     
-    for conf in all_confirmations:
-        interest = db.query(Interest).filter(Interest.id == conf.interest_id).first()
-        if interest:
+    for confirmed, interest_id, user_name in member_rows:
+        if interest_id is not None:
             status_text = 'pending'
-            if conf.confirmed is True:
+            if confirmed is True:
                 status_text = 'confirmed'
                 confirmed_count += 1
-            elif conf.confirmed is False:
+            elif confirmed is False:
                 status_text = 'declined'
             
             members.append({
-                'name': interest.user_name,
+                'name': user_name,
                 'status': status_text
             })
     
-    # Prepare group data
-    group_data = GroupConfirmationData(
-        id=group.id,
-        name=group.name,
-        destination_name=group.destination.name,
-        start_date=group.start_date.isoformat(),
-        end_date=group.end_date.isoformat(),
-        confirmed_members=confirmed_count,
-        total_members=len(all_confirmations),
-        price_per_person=float(group.price_per_person),
-        confirmation_deadline=group.confirmation_deadline.isoformat(),
-        deposit_amount=float(group.price_per_person * 0.3),  # 30% deposit
-        itinerary_highlights=group.itinerary.get('highlights', []) if group.itinerary else [],
-        members=members
-    )
-    
-    # Prepare confirmation status
-    confirmation_status = ConfirmationStatus(
-        id=confirmation.id,
-        confirmed=confirmation.confirmed,
-        payment_status=confirmation.payment_status,
-        expires_at=confirmation.expires_at.isoformat(),
-        decline_reason=confirmation.decline_reason
-    )
-    
-    return ConfirmationResult(
-        group=group_data,
-        confirmation=confirmation_status
-    )
+    # Group stores date_from/date_to and final_price_per_person; the itinerary lives on the destination
+    destination = group.destination
+    itinerary = destination.itinerary if destination else None
+    price_per_person = float(group.final_price_per_person)
+    
+    # Built as plain dicts in the ConfirmationResult shape; orjson encodes them without a validation pass
+    return {
+        'group': {
+            'id': group.id,
+            'name': group.name,
+            'destination_name': destination.name if destination else '',
+            'start_date': group.date_from.isoformat(),
+            'end_date': group.date_to.isoformat(),
+            'confirmed_members': confirmed_count,
+            'total_members': len(member_rows),
+            'price_per_person': price_per_person,
+            'confirmation_deadline': group.confirmation_deadline.isoformat() if group.confirmation_deadline else None,
+            'deposit_amount': price_per_person * 0.3,  # 30% deposit
+            'itinerary_highlights': itinerary.get('highlights', []) if isinstance(itinerary, dict) else [],
+            'members': members
+        },
+        'confirmation': {
+            'id': confirmation.id,
+            'confirmed': confirmation.confirmed,
+            'payment_status': confirmation.payment_status,
+            'expires_at': confirmation.expires_at.isoformat() if confirmation.expires_at else None,
+            'decline_reason': confirmation.decline_reason
+        }
+    }
 
 
 @router.post("/{group_id}/confirm/{token}")
-async def process_confirmation(
+def process_confirmation(
     group_id: int,
     token: str,
     response: ConfirmationResponse,
@@ -137,6 +170,8 @@ async def process_confirmation(
 ):
     """Process member confirmation or decline"""
     
+    _require_well_formed_token(token)
+    
     # Find the confirmation record
     confirmation = db.query(GroupMemberConfirmation).filter(
         GroupMemberConfirmation.group_id == group_id,
@@ -157,7 +192,7 @@ async def process_confirmation(
         )
     
     # Check if expired
-    if datetime.utcnow() > confirmation.expires_at:
+    if _has_expired(confirmation.expires_at):
         raise HTTPException(
             status_code=status.HTTP_410_GONE,
             detail="Confirmation has expired"
@@ -210,7 +245,7 @@ async def process_confirmation(
 
 
 @router.get("/{group_id}/status")
-async def get_group_formation_status(
+def get_group_formation_status(
     group_id: int,
     db: Session = Depends(get_db)
 ):
@@ -230,7 +265,7 @@ async def get_group_formation_status(
 
 
 @router.post("/{group_id}/finalize")
-async def force_finalize_group(
+def force_finalize_group(
     group_id: int,
     db: Session = Depends(get_db)
 ):
@@ -0,0 +1,142 @@
+"""
+Redis-backed response caching for read-heavy endpoints
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Iterable
+
+import orjson
+import redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Redis client for caching
+redis_client = redis.from_url(settings.REDIS_URL)
+
+# Cached dashboard payloads; invalidated when group confirmations change revenue/funnel figures
+DASHBOARD_SUMMARY_CACHE = "advanced-analytics:dashboard-summary"
+
+# Admin traveler / document statistics; invalidated on registrations, (de)activation and document changes
+TRAVELER_STATS_CACHE = "travelers:statistics"
+DOCUMENT_STATS_CACHE = "travelers:document-statistics"
+
+# Public social proof widgets (homepage messages, trending, activity, smart messages)
+SOCIAL_PROOF_CACHE = "socialproof"
+
+# Dependency parameters that never form part of a cache key
+DEFAULT_EXCLUDED_PARAMS = frozenset({"db"})
+
+
+def build_cache_key(namespace: str, params: Dict[str, Any]) -> str:
+    """Build a cache key that does not depend on query parameter order"""
+    payload = json.dumps(params, sort_keys=True, default=str)
+    digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+def cache_get(key: str) -> Any:
+    """Return the cached JSON value for key, or None on miss / Redis failure"""
+    try:
+        cached_data = redis_client.get(key)
+    except redis.RedisError as e:
+        logger.warning(f"Cache read failed for {key}: {e}")
+        return None
+    return orjson.loads(cached_data) if cached_data else None
+
+
+def cache_set(key: str, value: Any, expire: int) -> None:
+    """Store a JSON-serializable value under key for expire seconds"""
+    try:
+        redis_client.setex(key, expire, orjson.dumps(value, default=str))
+    except (redis.RedisError, TypeError) as e:
+        logger.warning(f"Cache write failed for {key}: {e}")
+
+
+def invalidate_namespace(namespace: str) -> None:
+    """Drop every cached entry under a namespace (e.g. after a write that changes it)"""
+    try:
+        keys = list(redis_client.scan_iter(match=f"{namespace}:*"))
+        if keys:
+            redis_client.delete(*keys)
+    except redis.RedisError as e:
+        logger.warning(f"Cache invalidation failed for {namespace}: {e}")
+
+
+def _is_cacheable(result: Any) -> bool:
+    return isinstance(result, (dict, list)) and not (isinstance(result, dict) and "error" in result)
+
+
+def cached_response(namespace: str, expire: int, exclude: Iterable[str] = (), stale_expire: int = 0):
+    """
+    Cache the JSON payload returned by an endpoint (sync or async).
+    For async endpoints the Redis calls run in a worker thread.
+
+    The key is derived from the endpoint's keyword arguments (query and path
+    params), so identical requests share an entry regardless of param order.
+    Payloads carrying an "error" key are never cached. When stale_expire is
+    set, a longer-lived copy is kept and served if the endpoint fails with a
+    5xx (e.g. the database is unavailable).
+    """
+    excluded = DEFAULT_EXCLUDED_PARAMS | frozenset(exclude)
+
+    def key_for(kwargs: Dict[str, Any]) -> str:
+        return build_cache_key(namespace, {k: v for k, v in kwargs.items() if k not in excluded})
+
+    def store(key: str, result: Any) -> None:
+        if _is_cacheable(result):
+            cache_set(key, result, expire)
+            if stale_expire:
+                cache_set(f"{key}:stale", result, stale_expire)
+
+    def stale_fallback(key: str, exc: Exception) -> Any:
+        if not stale_expire or getattr(exc, "status_code", 500) < 500:
+            return None
+        stale = cache_get(f"{key}:stale")
+        if stale is not None:
+            logger.warning(f"Serving stale cache for {namespace} after error: {exc}")
+        return stale
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                # The Redis client is blocking; keep its round-trips off the event loop
+                key = key_for(kwargs)
+                cached = await asyncio.to_thread(cache_get, key)
+                if cached is not None:
+                    return cached
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    stale = await asyncio.to_thread(stale_fallback, key, e)
+                    if stale is None:
+                        raise
+                    return stale
+                await asyncio.to_thread(store, key, result)
+                return result
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = key_for(kwargs)
+                cached = cache_get(key)
+                if cached is not None:
+                    return cached
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    stale = stale_fallback(key, e)
+                    if stale is None:
+                        raise
+                    return stale
+                store(key, result)
+                return result
+
+        return wrapper
+
+    return decorator
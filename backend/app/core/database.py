@@ -1,9 +1,22 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.core.config import settings
+from app.core.pool_monitor import MonitoredQueuePool
 
-engine = create_engine(settings.DATABASE_URL)
+if settings.DB_USE_PGBOUNCER:
+    engine = create_engine(settings.DATABASE_URL, poolclass=NullPool, pool_pre_ping=True)
+else:
+    engine = create_engine(
+        settings.DATABASE_URL,
+        poolclass=MonitoredQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True
+    )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
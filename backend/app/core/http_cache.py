@@ -0,0 +1,106 @@
+"""
+Conditional GET support (Cache-Control + ETag) for polled read-only endpoints
+"""
+
+import asyncio
+import functools
+import hashlib
+import inspect
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+
+# Clients may keep a copy but must revalidate it (cheaply, via If-None-Match) on every use
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+
+def _etag_for(body: bytes) -> str:
+    return f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True when the request's If-None-Match covers etag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {candidate.strip() for candidate in header.split(",")}
+    # Weak comparison: W/"x" and "x" match each other
+    return "*" in candidates or etag in candidates or etag[2:] in candidates
+
+
+def version_etag(*parts: Any) -> str:
+    """Weak ETag built from version markers (e.g. row count and newest updated_at) instead of the body"""
+    return _etag_for(repr(parts).encode("utf-8"))
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Tag the response with etag and return an empty 304 if the client already holds it.
+
+    Endpoints call this with a version_etag computed before the full query, so
+    an unchanged resource costs one aggregate SELECT and no serialization.
+    """
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def _conditional_response(request: Request, result: Any, cache_control: str) -> Response:
+    if isinstance(result, Response):
+        return result
+
+    response = ORJSONResponse(content=jsonable_encoder(result))
+    etag = _etag_for(response.body)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return response
+
+
+def http_cache(max_age: int, stale_while_revalidate: int = 0):
+    """
+    Add Cache-Control and a weak ETag (hash of the JSON body) to a GET endpoint.
+
+    Requests whose If-None-Match matches the current body get an empty 304.
+    Responses are marked private because every decorated endpoint sits behind
+    authentication, so shared proxies must not store them. Apply outside
+    @cached_response so Redis hits are revalidated too.
+    """
+    cache_control = f"private, max-age={max_age}"
+    if stale_while_revalidate:
+        cache_control += f", stale-while-revalidate={stale_while_revalidate}"
+
+    def decorator(func):
+        # Expose a Request parameter to FastAPI without changing the endpoint's own signature
+        signature = inspect.signature(func)
+        inject_request = "request" not in signature.parameters
+        if inject_request:
+            signature = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+            ])
+
+        def split_request(kwargs):
+            return kwargs.pop("request") if inject_request else kwargs["request"]
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                request = split_request(kwargs)
+                return _conditional_response(request, await func(*args, **kwargs), cache_control)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                request = split_request(kwargs)
+                return _conditional_response(request, func(*args, **kwargs), cache_control)
+
+        wrapper.__signature__ = signature
+        return wrapper
+
+    return decorator
@@ -0,0 +1,40 @@
+"""
+Keyset (seek) pagination for large admin lists
+"""
+
+import logging
+from typing import Any, Optional, Sequence
+
+from fastapi import Response
+from sqlalchemy.orm import Query
+
+logger = logging.getLogger(__name__)
+
+# OFFSET makes Postgres scan and discard every skipped row; past this depth clients should page by cursor
+DEEP_OFFSET_WARNING = 1000
+
+# Carries the id to pass as ?cursor= for the next page; absent on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def paginate(query: Query, id_column: Any, skip: int = 0, limit: int = 100, cursor: Optional[int] = None) -> Query:
+    """
+    Order newest-first by id and apply one page.
+
+    With a cursor the page is `WHERE id < cursor LIMIT n`, so its cost does not
+    grow with page depth. Without one the legacy skip/limit offset is kept.
+    """
+    query = query.order_by(id_column.desc())
+    if cursor is not None:
+        return query.filter(id_column < cursor).limit(limit)
+    if skip > DEEP_OFFSET_WARNING:
+        logger.warning(f"Deep OFFSET pagination (skip={skip}) on {id_column}; use the cursor parameter instead")
+    return query.offset(skip).limit(limit)
+
+
+def set_next_cursor(response: Response, items: Sequence[Any], limit: int) -> None:
+    """Expose the next page's cursor when this page came back full"""
+    if items and len(items) >= limit:
+        last = items[-1]
+        last_id = last["id"] if isinstance(last, dict) else last.id
+        response.headers[NEXT_CURSOR_HEADER] = str(last_id)
@@ -0,0 +1,87 @@
+"""
+Connection pool metrics to surface an undersized or exhausted database pool
+"""
+
+import threading
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = {
+    "connections_opened": 0,     # new physical connections (high churn = pool too small or recycled too often)
+    "connections_acquired": 0,   # checkouts served by the pool
+    "connections_released": 0,   # checkins back to the pool
+    "connections_invalidated": 0,
+    "checkout_timeouts": 0,      # requests that gave up after DB_POOL_TIMEOUT
+}
+
+
+def _increment(name: str) -> None:
+    with _lock:
+        _counters[name] += 1
+
+
+def _on_connect(dbapi_connection, connection_record):
+    _increment("connections_opened")
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    _increment("connections_acquired")
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    _increment("connections_released")
+
+
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    _increment("connections_invalidated")
+
+
+_LISTENERS = (
+    ("connect", _on_connect),
+    ("checkout", _on_checkout),
+    ("checkin", _on_checkin),
+    ("invalidate", _on_invalidate),
+)
+
+
+def install_pool_metrics(engine: Engine) -> None:
+    """Attach the pool event counters to an engine (idempotent)"""
+    for name, listener in _LISTENERS:
+        if not event.contains(engine, name, listener):
+            event.listen(engine, name, listener)
+
+
+class MonitoredQueuePool(QueuePool):
+    """
+    QueuePool that counts checkouts which gave up after pool_timeout.
+
+    Counted at the pool itself, so timeouts are seen whether the session came
+    from get_db or from SessionLocal() in a worker thread, and even when the
+    handler later turns the error into an HTTPException.
+    """
+
+    def _do_get(self):
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            _increment("checkout_timeouts")
+            raise
+
+
+def pool_stats(engine: Engine) -> Dict[str, Any]:
+    """Current pool occupancy plus cumulative counters since process start"""
+    pool = engine.pool
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    # NullPool (PgBouncer mode) keeps no connections, so it has no occupancy figures
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if method is not None:
+            stats[name] = method()
+    with _lock:
+        stats.update(_counters)
+    return stats
@@ -0,0 +1,77 @@
+"""
+Per-request SQL query counting to catch N+1 regressions
+"""
+
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Query budgets for endpoints known to be aggregation-heavy; matched by path suffix
+ROUTE_QUERY_LIMITS: Dict[str, int] = {
+    "/advanced-analytics/conversion-funnel": 4,
+    "/advanced-analytics/revenue-analytics": 2,
+    "/advanced-analytics/destination-performance": 2,
+    "/advanced-analytics/user-behavior": 4,
+    "/advanced-analytics/dashboard-summary": 4,
+    "/advanced-analytics/export": 4,
+    "/destinations/": 3,
+    "/destinations/admin/all": 5,
+    "/interests/admin/all": 3,
+    "/travelers/admin/travelers": 3,
+}
+
+# Holds a single-item list so worker threads spawned from the request share the counter
+_query_counter: ContextVar[Optional[List[int]]] = ContextVar("query_counter", default=None)
+
+
+class QueryCountExceeded(RuntimeError):
+    """Raised when a request issues more SQL statements than its budget allows"""
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def install_query_counter(engine: Engine) -> None:
+    """Attach the statement counter to an engine (idempotent)"""
+    if not event.contains(engine, "before_cursor_execute", _count_query):
+        event.listen(engine, "before_cursor_execute", _count_query)
+
+
+def query_limit_for(path: str) -> int:
+    for suffix, limit in ROUTE_QUERY_LIMITS.items():
+        if path.endswith(suffix):
+            return limit
+    return settings.SQL_QUERY_GUARD_DEFAULT_LIMIT
+
+
+@contextmanager
+def track_queries() -> Iterator[List[int]]:
+    """Count SQL statements executed within the block (including threads started from it)"""
+    counter = [0]
+    token = _query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_counter.reset(token)
+
+
+def check_query_count(path: str, count: int) -> None:
+    """Log, or raise when SQL_QUERY_GUARD_RAISE is set, if a request went over budget"""
+    limit = query_limit_for(path)
+    if count <= limit:
+        return
+    message = f"{path} issued {count} SQL queries (limit {limit}); possible N+1"
+    if settings.SQL_QUERY_GUARD_RAISE:
+        raise QueryCountExceeded(message)
+    logger.warning(message)
@@ -0,0 +1,87 @@
+"""
+Short-lived, in-process caches of resolved bearer tokens for the auth dependencies
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional, Tuple
+
+
+class TokenPrincipal(NamedTuple):
+    """The parts of a traveler the traveler auth dependencies need"""
+    id: int
+    is_active: bool
+    is_admin: bool
+
+
+class AdminPrincipal(NamedTuple):
+    """The parts of an admin that admin endpoints read (id, email, name, is_admin)"""
+    id: int
+    email: str
+    name: str
+    is_admin: bool
+
+
+class PrincipalCache:
+    """
+    TTL + LRU cache of principals keyed by token digest, so repeat requests skip
+    JWT decode and the user lookup. Entries never outlive the token's exp claim.
+    """
+
+    def __init__(self, ttl: int, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, token: str) -> Optional[Any]:
+        """Return the cached principal for a bearer token, or None on miss / expiry"""
+        digest = self._digest(token)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return principal
+
+    def put(self, token: str, principal: Any, token_exp: Optional[float]) -> None:
+        """Remember a resolved token for up to ttl seconds, evicting least recently used"""
+        ttl = self.ttl
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+        if ttl <= 0:
+            return
+        digest = self._digest(token)
+        with self._lock:
+            self._entries[digest] = (time.monotonic() + ttl, principal)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, traveler_id: int) -> None:
+        """Drop every cached token belonging to a traveler"""
+        with self._lock:
+            stale = [digest for digest, (_, principal) in self._entries.items() if principal.id == traveler_id]
+            for digest in stale:
+                del self._entries[digest]
+
+
+# Traveler tokens (SECRET_KEY) and admin tokens (JWT_SECRET) are signed differently, so they never share a cache
+traveler_tokens = PrincipalCache(ttl=30, max_size=10000)
+admin_tokens = PrincipalCache(ttl=60, max_size=1024)
+
+
+def invalidate_traveler_tokens(traveler_id: int) -> None:
+    """Drop a traveler's cached tokens (password change, deactivation, reactivation)"""
+    traveler_tokens.invalidate(traveler_id)
+    admin_tokens.invalidate(traveler_id)
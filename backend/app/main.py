@@ -1,21 +1,40 @@
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
 import logging
+import anyio
 from app.api.v1.api import api_router
+from app.api.v1.endpoints.auth import get_current_admin_user
 from app.core.config import settings
+from app.core.database import engine
+from app.core.logging_config import setup_queue_logging, stop_queue_logging
+from app.core.pool_monitor import install_pool_metrics, pool_stats
+from app.core.query_monitor import check_query_count, install_query_counter, track_queries
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Set up logging (records are written to stderr by a background thread)
+setup_queue_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="TravelKit API",
     version="1.0.0",
-    description="Travel platform with social proof and group pricing"
+    description="Travel platform with social proof and group pricing",
+    default_response_class=ORJSONResponse
 )
 
+@app.on_event("startup")
+async def configure_threadpool():
+    # Sync endpoints run on AnyIO's default limiter (40 threads); match it to what the DB pool can serve
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+
+
+@app.on_event("shutdown")
+def flush_logs():
+    stop_queue_logging()
+
+
 # Add request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -25,6 +44,20 @@ async def log_requests(request: Request, call_next):
     logger.info(f"Response status: {response.status_code}")
     return response
 
+# Pool acquisition counters, reported by /pool-health
+install_pool_metrics(engine)
+
+# Count SQL statements per request to surface N+1 regressions
+if settings.SQL_QUERY_GUARD_ENABLED:
+    install_query_counter(engine)
+
+    @app.middleware("http")
+    async def guard_query_count(request: Request, call_next):
+        with track_queries() as counter:
+            response = await call_next(request)
+        check_query_count(request.url.path, counter[0])
+        return response
+
 # Add CORS middleware first, before other middleware
 app.add_middleware(
     CORSMiddleware,
@@ -52,4 +85,10 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "environment": "development" if settings.DEBUG else "production"}
\ No newline at end of file
+    return {"status": "healthy", "environment": "development" if settings.DEBUG else "production"}
+
+
+@app.get("/pool-health", dependencies=[Depends(get_current_admin_user)])
+def pool_health():
+    """Database pool occupancy and acquisition counters (admin only)"""
+    return pool_stats(engine)
\ No newline at end of file
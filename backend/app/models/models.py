@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, JSON, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -44,15 +44,23 @@ class Interest(Base):
     budget_max = Column(Float)
     special_requests = Column(Text)
     status = Column(String, default="open")  # open, matched, converted, expired
-    group_id = Column(Integer, ForeignKey("groups.id"), nullable=True)
+    group_id = Column(Integer, ForeignKey("groups.id"), nullable=True, index=True)
     client_uuid = Column(String, unique=True, index=True)  # For idempotency
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
     destination = relationship("Destination", back_populates="interests")
     group = relationship("Group", back_populates="interests")
     traveler = relationship("Traveler", back_populates="interests")
+    
+    __table_args__ = (
+        Index("ix_interests_destination_id_status", "destination_id", "status"),
+        # Clustering analytics counts recently matched interests
+        Index("ix_interests_matched_updated_at", "updated_at", postgresql_where=text("status = 'matched'")),
+        # Traveler dashboard: a traveler's interests, optionally by status
+        Index("ix_interests_user_id_status", "user_id", "status"),
+    )
 
 
 class Group(Base):
@@ -69,6 +77,7 @@ class Group(Base):
     base_price = Column(Float, nullable=False)
     final_price_per_person = Column(Float, nullable=False)
     price_calc = Column(JSON)  # Pricing calculation details for audit
+    avg_compatibility = Column(Float)  # Mean pairwise member compatibility; NULL when unknown or invalidated by a membership change
     status = Column(String, default="forming")  # forming, pending_confirmation, confirmed, full, cancelled, merged
     admin_notes = Column(Text)
     
@@ -77,12 +86,16 @@ class Group(Base):
     auto_confirm_enabled = Column(Boolean, default=True)
     minimum_confirmation_rate = Column(Float, default=0.8)  # 80% of members must confirm
     
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
     destination = relationship("Destination", back_populates="groups")
     interests = relationship("Interest", back_populates="group")
+    
+    __table_args__ = (
+        Index("ix_groups_destination_id_status_created_at", destination_id, status, created_at.desc()),
+    )
 
 
 class Traveler(Base):
@@ -132,6 +145,13 @@ class Traveler(Base):
     documents = relationship("TravelerDocument", back_populates="traveler", foreign_keys="[TravelerDocument.user_id]")
     passenger_documents = relationship("PassengerDocument", back_populates="main_traveler", foreign_keys="[PassengerDocument.user_id]")
     travel_documents = relationship("TravelDocument", back_populates="uploader", foreign_keys="[TravelDocument.uploaded_by]")
+    
+    __table_args__ = (
+        # Admin traveler search uses ILIKE '%term%' on name/email/phone; trigram GIN indexes serve infix matches
+        Index("ix_users_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_users_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+        Index("ix_users_phone_trgm", "phone", postgresql_using="gin", postgresql_ops={"phone": "gin_trgm_ops"}),
+    )
 
 
 class HomepageMessage(Base):
@@ -183,6 +203,15 @@ class AnalyticsMaterialized(Base):
     destination = relationship("Destination")
 
 
+class SocialProofCache(Base):
+    __tablename__ = "social_proof_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String, unique=True, nullable=False, index=True)  # smart, generated
+    payload = Column(JSON, nullable=False)  # Precomputed response body, refreshed by Celery beat
+    generated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
 class UploadedFile(Base):
     __tablename__ = "uploaded_files"
     
@@ -296,6 +325,15 @@ class TravelerDocument(Base):
     # Relationships
     traveler = relationship("Traveler", back_populates="documents", foreign_keys=[user_id])
     verifier = relationship("Traveler", foreign_keys=[verified_by])
+    
+    __table_args__ = (
+        Index("ix_user_documents_user_id_document_type", "user_id", "document_type", postgresql_where=text("is_active")),
+        # Admin verification queue
+        Index(
+            "ix_user_documents_pending", "id",
+            postgresql_where=text("verification_status = 'pending' AND is_active")
+        ),
+    )
 
 
 class PassengerDocument(Base):
@@ -344,6 +382,14 @@ class PassengerDocument(Base):
     interest = relationship("Interest")
     group = relationship("Group")
     verifier = relationship("Traveler", foreign_keys=[verified_by])
+    
+    __table_args__ = (
+        Index("ix_passenger_documents_user_id_uploaded_at", "user_id", uploaded_at.desc(), postgresql_where=text("is_active")),
+        Index(
+            "ix_passenger_documents_pending", "id",
+            postgresql_where=text("verification_status = 'pending' AND is_active")
+        ),
+    )
 
 
 class TravelDocument(Base):
@@ -386,6 +432,10 @@ class TravelDocument(Base):
     uploader = relationship("Traveler", back_populates="travel_documents", foreign_keys=[uploaded_by])
     group = relationship("Group")
     destination = relationship("Destination")
+    
+    __table_args__ = (
+        Index("ix_travel_documents_group_id_destination_id", "group_id", "destination_id", postgresql_where=text("is_active")),
+    )
 
 
 class DocumentAccess(Base):
@@ -479,6 +529,11 @@ class GroupMemberConfirmation(Base):
     group = relationship("Group")
     interest = relationship("Interest")
     traveler = relationship("Traveler")
+    
+    __table_args__ = (
+        # Member lists and formation status read every confirmation of a group; token lookups use the unique token index
+        Index("ix_group_member_confirmations_group_id", "group_id"),
+    )
 
 
 class PaymentTransaction(Base):
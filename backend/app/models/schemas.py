@@ -123,6 +123,21 @@ class GroupCreate(GroupBase):
     pass
 
 
+class GroupUpdate(BaseModel):
+    name: Optional[str] = None
+    status: Optional[str] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    min_size: Optional[int] = None
+    max_size: Optional[int] = None
+    base_price: Optional[float] = None
+    final_price_per_person: Optional[float] = None
+    admin_notes: Optional[str] = None
+    
+    class Config:
+        extra = "forbid"
+
+
 class Group(GroupBase):
     id: int
     current_size: int
@@ -501,10 +516,14 @@ class GroupDetails(BaseModel):
 
 class CompatibilityAnalysis(BaseModel):
     average_compatibility: float
-    compatibility_matrix: dict
     group_quality: str
 
 
+class CompatibilityMatrix(BaseModel):
+    group_id: int
+    compatibility_matrix: dict
+
+
 class GroupAnalysis(BaseModel):
     group: GroupDetails
     members: List[GroupMember]
@@ -4,13 +4,25 @@ Provides comprehensive business intelligence, conversion tracking, and revenue a
 """
 
 import logging
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
-from sqlalchemy import and_, desc, func, or_
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple, Union
+from sqlalchemy import and_, case, desc, func, or_, select, true
 from sqlalchemy.orm import Session
 
 from app.models.models import Destination, Group, Interest, Traveler
 
+DateLike = Union[date, datetime]
+
+
+def _to_datetime(value: DateLike, end_of_day: bool = False) -> datetime:
+    """
+    Promote a plain date (e.g. from a query param) to a datetime bound.
+    End dates cover the whole day so `created_at <= end_date` stays a tight range scan.
+    """
+    if isinstance(value, datetime):
+        return value
+    return datetime.combine(value, time.max if end_of_day else time.min)
+
 
 class AdvancedAnalyticsService:
     """Advanced analytics service for business intelligence and performance tracking"""
@@ -21,16 +33,14 @@ class AdvancedAnalyticsService:
 
     def get_conversion_funnel(
         self, 
-        start_date: Optional[datetime] = None, 
-        end_date: Optional[datetime] = None,
+        start_date: Optional[DateLike] = None, 
+        end_date: Optional[DateLike] = None,
         destination_id: Optional[int] = None
     ) -> Dict[str, Any]:
         """Get detailed conversion funnel analysis"""
         try:
-            if not start_date:
-                start_date = datetime.now() - timedelta(days=30)
-            if not end_date:
-                end_date = datetime.now()
+            start_date = _to_datetime(start_date) if start_date else datetime.now() - timedelta(days=30)
+            end_date = _to_datetime(end_date, end_of_day=True) if end_date else datetime.now()
 
             # Base query filters
             filters = [
@@ -99,6 +109,7 @@ class AdvancedAnalyticsService:
                 },
                 'summary': {
                     'overall_conversion_rate': round(overall_conversion_rate, 2),
+                    'total_data_points': total_interests + matched_interests + confirmed_groups + paid_groups,
                     'drop_off_points': self._identify_drop_off_points({
                         'interests': total_interests,
                         'matched': matched_interests,
@@ -114,16 +125,14 @@ class AdvancedAnalyticsService:
 
     def get_revenue_analytics(
         self,
-        start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None,
+        start_date: Optional[DateLike] = None,
+        end_date: Optional[DateLike] = None,
         group_by: str = 'month'
     ) -> Dict[str, Any]:
         """Get comprehensive revenue analytics"""
         try:
-            if not start_date:
-                start_date = datetime.now() - timedelta(days=90)
-            if not end_date:
-                end_date = datetime.now()
+            start_date = _to_datetime(start_date) if start_date else datetime.now() - timedelta(days=90)
+            end_date = _to_datetime(end_date, end_of_day=True) if end_date else datetime.now()
 
             # Get revenue data from paid groups
             revenue_query = self.db.query(
@@ -193,27 +202,38 @@ class AdvancedAnalyticsService:
 
     def get_destination_performance(
         self,
-        start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None,
-        limit: int = 20
+        start_date: Optional[DateLike] = None,
+        end_date: Optional[DateLike] = None,
+        limit: int = 20,
+        sort_by: str = 'interests'
     ) -> Dict[str, Any]:
-        """Get detailed destination performance metrics"""
+        """Get detailed destination performance metrics, ordered and ranked in SQL by sort_by"""
         try:
-            if not start_date:
-                start_date = datetime.now() - timedelta(days=30)
-            if not end_date:
-                end_date = datetime.now()
+            start_date = _to_datetime(start_date) if start_date else datetime.now() - timedelta(days=30)
+            end_date = _to_datetime(end_date, end_of_day=True) if end_date else datetime.now()
+
+            total_interests_col = func.count(Interest.id)
+            groups_formed_col = func.count(Group.id)
+            revenue_col = func.coalesce(func.sum(Group.current_size * Group.final_price_per_person), 0)
+            conversion_col = func.coalesce(groups_formed_col * 100.0 / func.nullif(total_interests_col, 0), 0)
+            sort_columns = {
+                'interests': total_interests_col,
+                'revenue': revenue_col,
+                'conversion': conversion_col
+            }
+            order_column = sort_columns.get(sort_by, total_interests_col).desc()
 
             # Get destination metrics
             performance_query = self.db.query(
                 Destination.id,
                 Destination.name,
                 Destination.country,
-                func.count(Interest.id).label('total_interests'),
+                total_interests_col.label('total_interests'),
                 func.count(func.distinct(Interest.user_email)).label('unique_users'),
                 func.avg(Interest.num_people).label('avg_group_size'),
-                func.count(Group.id).label('groups_formed'),
-                func.sum(Group.current_size * Group.final_price_per_person).label('revenue_generated')
+                groups_formed_col.label('groups_formed'),
+                revenue_col.label('revenue_generated'),
+                func.rank().over(order_by=order_column).label('ranking')
             ).outerjoin(
                 Interest, Destination.id == Interest.destination_id
             ).outerjoin(
@@ -230,9 +250,14 @@ class AdvancedAnalyticsService:
             ).group_by(
                 Destination.id, Destination.name, Destination.country
             ).order_by(
-                func.count(Interest.id).desc()
+                order_column
             ).limit(limit).all()
 
+            # Momentum for every returned destination in a single query
+            momentum_scores = self._calculate_destination_momentum(
+                [dest.id for dest in performance_query], start_date, end_date
+            )
+
             destinations = []
             for dest in performance_query:
                 # Calculate conversion rate
@@ -240,8 +265,7 @@ class AdvancedAnalyticsService:
                 groups_count = dest.groups_formed or 0
                 conversion_rate = (groups_count / interests_count * 100) if interests_count > 0 else 0
                 
-                # Calculate momentum
-                momentum = self._calculate_destination_momentum(dest.id, start_date, end_date)
+                momentum = momentum_scores.get(dest.id, 0.0)
                 
                 destinations.append({
                     'destination_id': dest.id,
@@ -256,7 +280,7 @@ class AdvancedAnalyticsService:
                         'conversion_rate': round(conversion_rate, 2),
                         'momentum_score': round(momentum, 2)
                     },
-                    'ranking': len(destinations) + 1
+                    'ranking': dest.ranking
                 })
 
             # Calculate category totals
@@ -280,7 +304,7 @@ class AdvancedAnalyticsService:
                 },
                 'destinations': destinations,
                 'top_performers': {
-                    'by_interest': destinations[:5],
+                    'by_interest': sorted(destinations, key=lambda x: x['metrics']['total_interests'], reverse=True)[:5],
                     'by_revenue': sorted(destinations, key=lambda x: x['metrics']['revenue_generated'], reverse=True)[:5],
                     'by_conversion': sorted(destinations, key=lambda x: x['metrics']['conversion_rate'], reverse=True)[:5]
                 }
@@ -292,15 +316,13 @@ class AdvancedAnalyticsService:
 
     def get_user_behavior_analytics(
         self,
-        start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        start_date: Optional[DateLike] = None,
+        end_date: Optional[DateLike] = None
     ) -> Dict[str, Any]:
         """Get user behavior and engagement analytics"""
         try:
-            if not start_date:
-                start_date = datetime.now() - timedelta(days=30)
-            if not end_date:
-                end_date = datetime.now()
+            start_date = _to_datetime(start_date) if start_date else datetime.now() - timedelta(days=30)
+            end_date = _to_datetime(end_date, end_of_day=True) if end_date else datetime.now()
 
             # User engagement metrics
             total_users = self.db.query(func.count(func.distinct(Interest.user_email))).filter(
@@ -381,6 +403,113 @@ class AdvancedAnalyticsService:
             self.logger.error(f"Error generating user behavior analytics: {e}")
             return {}
 
+    def get_dashboard_bundle(
+        self,
+        start_date: DateLike,
+        end_date: DateLike,
+        top_limit: int = 5
+    ) -> Dict[str, Any]:
+        """
+        Get the headline dashboard metrics with the funnel, revenue and user
+        aggregates computed together in a single CTE-based query.
+        """
+        try:
+            start_date = _to_datetime(start_date)
+            end_date = _to_datetime(end_date, end_of_day=True)
+
+            interest_filters = [
+                Interest.created_at >= start_date,
+                Interest.created_at <= end_date
+            ]
+
+            interests_cte = select(
+                func.count(Interest.id).label('total_interests'),
+                func.count(case((Interest.status == 'matched', 1))).label('matched_interests'),
+                func.count(func.distinct(Interest.user_email)).label('total_users')
+            ).where(*interest_filters).cte('interests_cte')
+
+            confirmed_cte = select(
+                func.count(func.distinct(Group.id)).label('confirmed_groups')
+            ).select_from(Group).join(
+                Interest, Group.id == Interest.group_id
+            ).where(*interest_filters, Group.status == 'confirmed').cte('confirmed_cte')
+
+            repeat_users = select(Interest.user_email).where(
+                *interest_filters
+            ).group_by(Interest.user_email).having(func.count(Interest.id) > 1).subquery()
+            users_cte = select(
+                func.count().label('repeat_users')
+            ).select_from(repeat_users).cte('users_cte')
+
+            bookings_cte = select(
+                func.count(Group.id).label('total_bookings'),
+                func.coalesce(func.sum(Group.current_size * Group.final_price_per_person), 0).label('total_revenue')
+            ).where(
+                Group.status == 'confirmed',
+                Group.created_at >= start_date,
+                Group.created_at <= end_date
+            ).cte('bookings_cte')
+
+            totals = self.db.execute(
+                select(interests_cte, confirmed_cte, users_cte, bookings_cte).select_from(
+                    interests_cte
+                    .join(confirmed_cte, true())
+                    .join(users_cte, true())
+                    .join(bookings_cte, true())
+                )
+            ).one()
+
+            # Weekly revenue series for growth/trend (weeks start on Monday, as in _generate_revenue_time_series)
+            week_start = func.date_trunc('week', Group.created_at)
+            weekly_revenue = self.db.query(
+                week_start.label('week_start'),
+                func.sum(Group.current_size * Group.final_price_per_person).label('revenue')
+            ).filter(
+                Group.status == 'confirmed',
+                Group.created_at >= start_date,
+                Group.created_at <= end_date
+            ).group_by(week_start).order_by(week_start).all()
+            time_series = [
+                {'period': row.week_start.date().isoformat(), 'revenue': row.revenue or 0}
+                for row in weekly_revenue
+            ]
+            growth = self._calculate_revenue_growth(time_series)
+
+            total_interests = totals.total_interests
+            # Payments are tracked via confirmed groups for now (see get_conversion_funnel)
+            paid_groups = totals.confirmed_groups
+            total_revenue = float(totals.total_revenue)
+            total_users = totals.total_users
+
+            performance = self.get_destination_performance(start_date, end_date, top_limit)
+
+            return {
+                'key_metrics': {
+                    'total_interests': total_interests,
+                    'conversion_rate': round((paid_groups / total_interests * 100) if total_interests > 0 else 0, 2),
+                    'total_revenue': total_revenue,
+                    'total_bookings': totals.total_bookings,
+                    'avg_booking_value': round(total_revenue / totals.total_bookings, 2) if totals.total_bookings > 0 else 0,
+                    'total_users': total_users,
+                    'repeat_rate': round((totals.repeat_users / total_users * 100) if total_users > 0 else 0, 2)
+                },
+                'trends': {
+                    'revenue_growth': growth.get('growth_rate', 0),
+                    'revenue_trend': growth.get('trend', 'stable'),
+                    'drop_off_points': self._identify_drop_off_points({
+                        'interests': total_interests,
+                        'matched': totals.matched_interests,
+                        'confirmed': totals.confirmed_groups,
+                        'paid': paid_groups
+                    })
+                },
+                'top_destinations': performance.get('destinations', [])
+            }
+
+        except Exception as e:
+            self.logger.error(f"Error generating dashboard bundle: {e}")
+            return {}
+
     def _identify_drop_off_points(self, funnel_data: Dict[str, int]) -> List[Dict[str, Any]]:
         """Identify where users drop off in the conversion funnel"""
         drop_offs = []
@@ -457,40 +586,40 @@ class AdvancedAnalyticsService:
 
     def _calculate_destination_momentum(
         self, 
-        destination_id: int, 
+        destination_ids: List[int], 
         start_date: datetime, 
         end_date: datetime
-    ) -> float:
-        """Calculate momentum score for a destination"""
+    ) -> Dict[int, float]:
+        """Calculate momentum scores for several destinations with one grouped query"""
         try:
             total_days = (end_date - start_date).days
-            if total_days < 14:
-                return 0.0
+            if total_days < 14 or not destination_ids:
+                return {}
             
             mid_point = start_date + timedelta(days=total_days // 2)
             
-            # Recent period activity
-            recent_count = self.db.query(Interest).filter(
-                Interest.destination_id == destination_id,
-                Interest.created_at >= mid_point,
-                Interest.created_at <= end_date
-            ).count()
-            
-            # Earlier period activity
-            earlier_count = self.db.query(Interest).filter(
-                Interest.destination_id == destination_id,
+            # Recent vs earlier period activity per destination
+            period_counts = self.db.query(
+                Interest.destination_id,
+                func.count(case((Interest.created_at >= mid_point, 1))).label('recent_count'),
+                func.count(case((Interest.created_at < mid_point, 1))).label('earlier_count')
+            ).filter(
+                Interest.destination_id.in_(destination_ids),
                 Interest.created_at >= start_date,
-                Interest.created_at < mid_point
-            ).count()
-            
-            if earlier_count == 0:
-                return 1.0 if recent_count > 0 else 0.0
+                Interest.created_at <= end_date
+            ).group_by(Interest.destination_id).all()
             
-            return min((recent_count / earlier_count), 5.0)  # Cap at 5x growth
+            momentum = {}
+            for row in period_counts:
+                if row.earlier_count == 0:
+                    momentum[row.destination_id] = 1.0 if row.recent_count > 0 else 0.0
+                else:
+                    momentum[row.destination_id] = min((row.recent_count / row.earlier_count), 5.0)  # Cap at 5x growth
+            return momentum
             
         except Exception as e:
-            self.logger.error(f"Error calculating momentum for destination {destination_id}: {e}")
-            return 0.0
+            self.logger.error(f"Error calculating destination momentum: {e}")
+            return {}
 
     def _analyze_user_journeys(self, interest_patterns: List) -> Dict[str, Any]:
         """Analyze common user journey patterns"""
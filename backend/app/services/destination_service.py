@@ -1,12 +1,13 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy import and_, case, desc, func
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
 import redis
 from app.models.models import Destination, Interest
 from app.models import schemas
 from app.core.config import settings
+from app.core.pagination import paginate
 
 # Redis client for caching
 redis_client = redis.from_url(settings.REDIS_URL)
@@ -16,21 +17,15 @@ class DestinationService:
     def __init__(self, db: Session):
         self.db = db
 
-    async def get_destinations_with_interest_summary(self, skip: int = 0, limit: int = 100) -> List[schemas.Destination]:
+    def get_destinations_with_interest_summary(self, skip: int = 0, limit: int = 100) -> List[schemas.Destination]:
         """Get destinations with interest summary data"""
         destinations = self.db.query(Destination).filter(
             Destination.is_active == True
         ).offset(skip).limit(limit).all()
         
-        result = []
-        for dest in destinations:
-            dest_dict = dest.__dict__.copy()
-            dest_dict['interest_summary'] = await self._get_interest_summary(dest.id)
-            result.append(schemas.Destination(**dest_dict))
-        
-        return result
+        return self._with_interest_summaries(destinations)
 
-    async def get_destination_by_id(self, destination_id: int) -> Optional[schemas.Destination]:
+    def get_destination_by_id(self, destination_id: int) -> Optional[schemas.Destination]:
         """Get single destination with interest summary"""
         destination = self.db.query(Destination).filter(
             Destination.id == destination_id,
@@ -41,55 +36,78 @@ class DestinationService:
             return None
             
         dest_dict = destination.__dict__.copy()
-        dest_dict['interest_summary'] = await self._get_interest_summary(destination_id)
+        dest_dict['interest_summary'] = self._get_interest_summary(destination_id)
         return schemas.Destination(**dest_dict)
 
-    async def _get_interest_summary(self, destination_id: int) -> schemas.InterestSummary:
+    def _get_interest_summary(self, destination_id: int) -> schemas.InterestSummary:
         """Get interest summary for a destination"""
+        return self._get_interest_summaries([destination_id])[destination_id]
+
+    def _get_interest_summaries(self, destination_ids: List[int]) -> Dict[int, schemas.InterestSummary]:
+        """Get interest summaries for several destinations with two grouped queries"""
+        if not destination_ids:
+            return {}
+        
         now = datetime.utcnow()
         thirty_days_ago = now - timedelta(days=30)
         thirty_days_future = now + timedelta(days=30)
         
-        # Count interests in last 30 days
-        last_30_count = self.db.query(Interest).filter(
-            Interest.destination_id == destination_id,
-            Interest.created_at >= thirty_days_ago,
+        # Count interests in last 30 days and for next 30 days, per destination
+        counts = self.db.query(
+            Interest.destination_id,
+            func.count(case((Interest.created_at >= thirty_days_ago, 1))).label('last_30_count'),
+            func.count(case((and_(
+                Interest.date_from <= thirty_days_future,
+                Interest.date_from >= now
+            ), 1))).label('next_30_count')
+        ).filter(
+            Interest.destination_id.in_(destination_ids),
             Interest.status == 'open'
-        ).count()
-        
-        # Count interests for next 30 days
-        next_30_count = self.db.query(Interest).filter(
-            Interest.destination_id == destination_id,
-            Interest.date_from <= thirty_days_future,
-            Interest.date_from >= now,
-            Interest.status == 'open'
-        ).count()
-        
-        # Get recent names sample
-        recent_interests = self.db.query(Interest).filter(
-            Interest.destination_id == destination_id,
+        ).group_by(Interest.destination_id).all()
+        counts_by_destination = {row.destination_id: row for row in counts}
+        
+        # Get recent names sample: the 4 newest open interests per destination
+        recency = func.row_number().over(
+            partition_by=Interest.destination_id,
+            order_by=desc(Interest.created_at)
+        ).label('recency')
+        recent = self.db.query(
+            Interest.destination_id, Interest.user_name, recency
+        ).filter(
+            Interest.destination_id.in_(destination_ids),
             Interest.created_at >= thirty_days_ago,
             Interest.status == 'open'
-        ).order_by(desc(Interest.created_at)).limit(4).all()
-        
-        if recent_interests:
-            names = [interest.user_name.split()[0] for interest in recent_interests]  # First names only
-            if len(names) == 1:
-                names_sample = f"{names[0]} is interested"
-            elif len(names) <= 3:
-                names_sample = f"{', '.join(names[:-1])} and {names[-1]} are interested"
-            else:
-                names_sample = f"{names[0]} and {len(names)-1} others are interested"
+        ).subquery()
+        recent_rows = self.db.query(
+            recent.c.destination_id, recent.c.user_name
+        ).filter(recent.c.recency <= 4).order_by(recent.c.destination_id, recent.c.recency).all()
+        
+        names_by_destination: Dict[int, List[str]] = {}
+        for row in recent_rows:
+            names_by_destination.setdefault(row.destination_id, []).append(row.user_name.split()[0])  # First names only
+        
+        summaries = {}
+        for destination_id in destination_ids:
+            row = counts_by_destination.get(destination_id)
+            summaries[destination_id] = schemas.InterestSummary(
+                total_interested_last_30_days=row.last_30_count if row else 0,
+                next_30_day_count=row.next_30_count if row else 0,
+                recent_names_sample=self._format_names_sample(names_by_destination.get(destination_id, []))
+            )
+        return summaries
+
+    @staticmethod
+    def _format_names_sample(names: List[str]) -> str:
+        if not names:
+            return "Be the first to show interest!"
+        if len(names) == 1:
+            return f"{names[0]} is interested"
+        elif len(names) <= 3:
+            return f"{', '.join(names[:-1])} and {names[-1]} are interested"
         else:
-            names_sample = "Be the first to show interest!"
-        
-        return schemas.InterestSummary(
-            total_interested_last_30_days=last_30_count,
-            next_30_day_count=next_30_count,
-            recent_names_sample=names_sample
-        )
+            return f"{names[0]} and {len(names)-1} others are interested"
 
-    async def get_calendar_data(self, destination_id: int, month: str) -> schemas.CalendarResponse:
+    def get_calendar_data(self, destination_id: int, month: str) -> schemas.CalendarResponse:
         """Get calendar data for a destination and month"""
         try:
             year, month_num = map(int, month.split('-'))
@@ -140,7 +158,7 @@ class DestinationService:
             data=[schemas.CalendarData(**item) for item in data]
         )
 
-    async def create_destination(self, destination_data: schemas.DestinationCreate) -> schemas.Destination:
+    def create_destination(self, destination_data: schemas.DestinationCreate) -> schemas.Destination:
         """Create new destination"""
         destination = None
         try:
@@ -150,7 +168,7 @@ class DestinationService:
             self.db.refresh(destination)
             
             dest_dict = destination.__dict__.copy()
-            dest_dict['interest_summary'] = await self._get_interest_summary(destination.id)
+            dest_dict['interest_summary'] = self._get_interest_summary(destination.id)
             return schemas.Destination(**dest_dict)
         except IntegrityError as e:
             self.db.rollback()
@@ -164,7 +182,7 @@ class DestinationService:
             self.db.rollback()
             raise e
 
-    async def update_destination(self, destination_id: int, destination_update: schemas.DestinationUpdate) -> Optional[schemas.Destination]:
+    def update_destination(self, destination_id: int, destination_update: schemas.DestinationUpdate) -> Optional[schemas.Destination]:
         """Update destination"""
         destination = self.db.query(Destination).filter(Destination.id == destination_id).first()
         if not destination:
@@ -178,10 +196,10 @@ class DestinationService:
         self.db.refresh(destination)
         
         dest_dict = destination.__dict__.copy()
-        dest_dict['interest_summary'] = await self._get_interest_summary(destination.id)
+        dest_dict['interest_summary'] = self._get_interest_summary(destination.id)
         return schemas.Destination(**dest_dict)
 
-    async def delete_destination(self, destination_id: int) -> bool:
+    def delete_destination(self, destination_id: int) -> bool:
         """Soft delete destination"""
         destination = self.db.query(Destination).filter(Destination.id == destination_id).first()
         if not destination:
@@ -191,19 +209,31 @@ class DestinationService:
         self.db.commit()
         return True
 
-    async def get_all_destinations_admin(self, skip: int = 0, limit: int = 100, include_inactive: bool = False) -> List[schemas.Destination]:
+    def get_all_destinations_admin(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        include_inactive: bool = False,
+        cursor: Optional[int] = None
+    ) -> List[schemas.Destination]:
         """Get all destinations for admin (including inactive if requested)"""
         query = self.db.query(Destination)
         
         if not include_inactive:
             query = query.filter(Destination.is_active == True)
         
-        destinations = query.offset(skip).limit(limit).all()
+        destinations = paginate(query, Destination.id, skip, limit, cursor).all()
+        
+        return self._with_interest_summaries(destinations)
+
+    def _with_interest_summaries(self, destinations: List[Destination]) -> List[schemas.Destination]:
+        """Attach interest summaries to a page of destinations without a query per row"""
+        summaries = self._get_interest_summaries([dest.id for dest in destinations])
         
         result = []
         for dest in destinations:
             dest_dict = dest.__dict__.copy()
-            dest_dict['interest_summary'] = await self._get_interest_summary(dest.id)
+            dest_dict['interest_summary'] = summaries[dest.id]
             result.append(schemas.Destination(**dest_dict))
         
         return result
\ No newline at end of file
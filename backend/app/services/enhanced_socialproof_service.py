@@ -38,9 +38,20 @@ class UserSegment(Enum):
 class EnhancedSocialProofAnalytics:
     """Enhanced analytics for social proof optimization"""
     
+    logger = logging.getLogger(__name__)
+    
+    # Default variant per segment when performance data is not conclusive
+    SEGMENT_PREFERENCES = {
+        UserSegment.FIRST_TIME_VISITOR: SocialProofVariant.SOCIAL_FOCUSED,
+        UserSegment.RETURN_VISITOR: SocialProofVariant.URGENCY_FOCUSED,
+        UserSegment.HIGH_BUDGET: SocialProofVariant.BENEFIT_FOCUSED,
+        UserSegment.BUDGET_CONSCIOUS: SocialProofVariant.BENEFIT_FOCUSED,
+        UserSegment.FREQUENT_TRAVELER: SocialProofVariant.DEADLINE_FOCUSED,
+        UserSegment.FAMILY_TRAVELER: SocialProofVariant.SOCIAL_FOCUSED
+    }
+    
     def __init__(self, db: Session):
         self.db = db
-        self.logger = logging.getLogger(__name__)
 
     def get_trending_destinations(self, limit: int = 10, time_window_days: int = 7) -> List[Dict[str, Any]]:
         """Get trending destinations based on recent interest activity"""
@@ -326,22 +337,12 @@ class EnhancedSocialProofAnalytics:
         # Get historical performance data
         performance_data = self._get_variant_performance(destination_id)
         
-        # Segment-based preferences
-        segment_preferences = {
-            UserSegment.FIRST_TIME_VISITOR: SocialProofVariant.SOCIAL_FOCUSED,
-            UserSegment.RETURN_VISITOR: SocialProofVariant.URGENCY_FOCUSED,
-            UserSegment.HIGH_BUDGET: SocialProofVariant.BENEFIT_FOCUSED,
-            UserSegment.BUDGET_CONSCIOUS: SocialProofVariant.BENEFIT_FOCUSED,
-            UserSegment.FREQUENT_TRAVELER: SocialProofVariant.DEADLINE_FOCUSED,
-            UserSegment.FAMILY_TRAVELER: SocialProofVariant.SOCIAL_FOCUSED
-        }
-        
         # Check if we have performance data to override defaults
         best_performing = self._get_best_performing_variant(performance_data)
         if best_performing and performance_data[best_performing]['confidence'] > 0.8:
             return SocialProofVariant(best_performing)
         
-        return segment_preferences.get(user_segment, SocialProofVariant.SOCIAL_FOCUSED)
+        return self.SEGMENT_PREFERENCES.get(user_segment, SocialProofVariant.SOCIAL_FOCUSED)
     
     def generate_personalized_message(
         self,
@@ -361,7 +362,38 @@ class EnhancedSocialProofAnalytics:
         # Get real-time metrics
         metrics = self._get_destination_metrics(destination_id)
         
-        # Generate message based on variant
+        return self._render_variant_message(destination, variant, metrics)
+    
+    def generate_personalized_messages_bulk(
+        self,
+        destination_id: int,
+        variants: List[SocialProofVariant],
+        real_time_data: Dict[str, Any]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Generate one message per variant from a single destination / metrics snapshot"""
+        
+        destination = self.db.query(Destination).filter(
+            Destination.id == destination_id
+        ).first()
+        
+        if not destination:
+            return {variant.value: self._get_fallback_message() for variant in variants}
+        
+        metrics = self._get_destination_metrics(destination_id)
+        
+        return {
+            variant.value: self._render_variant_message(destination, variant, metrics)
+            for variant in variants
+        }
+    
+    def _render_variant_message(
+        self,
+        destination: Destination,
+        variant: SocialProofVariant,
+        metrics: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Format the message for one variant from already-fetched metrics"""
+        
         if variant == SocialProofVariant.URGENCY_FOCUSED:
             return self._generate_urgency_message(destination, metrics)
         elif variant == SocialProofVariant.SOCIAL_FOCUSED:
@@ -1,15 +1,89 @@
+import asyncio
 import os
 import uuid
-import shutil
-from typing import List, Optional
+from typing import BinaryIO, List, Optional, Tuple
 from fastapi import UploadFile
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
 from datetime import datetime
 from PIL import Image
 from app.models.models import UploadedFile
 from app.models import schemas
 from app.core.config import settings
+from app.core.pagination import paginate
+
+# Uploads are copied to disk in fixed-size chunks so size limits abort early
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+# Bytes read from the start of an upload to identify its real format
+SNIFF_LENGTH = 32
+
+# Canonical extension for each image format we accept, keyed by sniffed MIME type
+IMAGE_EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/webp": ".webp",
+}
+
+
+class FileTooLargeError(ValueError):
+    """Raised when an upload exceeds the allowed size"""
+
+
+def sniff_image_type(header: bytes) -> Optional[str]:
+    """Identify PNG / JPEG / WebP from magic bytes; None for anything else"""
+    if header[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if header[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+async def sniff_upload(file: UploadFile) -> Optional[str]:
+    """Sniff an upload's image type from its first bytes, leaving the stream at the start"""
+    header = await file.read(SNIFF_LENGTH)
+    await file.seek(0)
+    return sniff_image_type(header)
+
+
+def copy_upload(source: BinaryIO, file_path: str, max_size: Optional[int] = None) -> int:
+    """Stream an upload to disk, stopping as soon as max_size is exceeded; returns bytes written"""
+    total = 0
+    try:
+        with open(file_path, "wb") as buffer:
+            while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                total += len(chunk)
+                if max_size is not None and total > max_size:
+                    raise FileTooLargeError(f"Upload exceeds {max_size} bytes")
+                buffer.write(chunk)
+    except Exception:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return total
+
+
+def _create_thumbnail(file_path: str, thumbnail_path: str) -> Tuple[int, int]:
+    """Write a 300x300 (max) JPEG thumbnail; returns the original image dimensions"""
+    with Image.open(file_path) as img:
+        original_size = img.size
+        
+        # Convert to RGB if necessary (for PNG with transparency)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            if img.mode == 'P':
+                img = img.convert('RGBA')
+            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+            img = background
+        
+        # Create thumbnail (300x300 max, maintaining aspect ratio)
+        img.thumbnail((300, 300), Image.Resampling.LANCZOS)
+        img.save(thumbnail_path, "JPEG", quality=85, optimize=True)
+    
+    return original_size
+
 
 class FileService:
     def __init__(self, db: Session):
@@ -21,39 +95,32 @@ class FileService:
         os.makedirs(self.upload_dir, exist_ok=True)
         os.makedirs(self.thumbnail_dir, exist_ok=True)
 
-    async def upload_image(self, file: UploadFile, user_id: int) -> schemas.FileUploadResponse:
-        """Upload and process an image file"""
-        
-        # Generate unique filename
-        file_extension = os.path.splitext(file.filename)[1]
+    async def upload_image(
+        self,
+        file: UploadFile,
+        user_id: int,
+        content_type: str,
+        max_size: Optional[int] = None
+    ) -> schemas.FileUploadResponse:
+        """
+        Upload and process an image file whose type was sniffed as content_type.
+        Raises FileTooLargeError past max_size bytes.
+        """
+        
+        # Generate unique filename; the extension follows the sniffed type, never the client's filename
+        file_extension = IMAGE_EXTENSIONS[content_type]
         unique_filename = f"{uuid.uuid4()}{file_extension}"
         file_path = os.path.join(self.upload_dir, unique_filename)
         
-        # Save the original file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Save the original file off the event loop, enforcing the size limit while copying
+        await asyncio.to_thread(copy_upload, file.file, file_path, max_size)
         
-        # Generate thumbnail
+        # Generate thumbnail on a worker thread (PIL decode/resize is CPU-bound)
         thumbnail_filename = f"thumb_{unique_filename}"
         thumbnail_path = os.path.join(self.thumbnail_dir, thumbnail_filename)
         
         try:
-            with Image.open(file_path) as img:
-                # Convert to RGB if necessary (for PNG with transparency)
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                
-                # Create thumbnail (300x300 max, maintaining aspect ratio)
-                img.thumbnail((300, 300), Image.Resampling.LANCZOS)
-                img.save(thumbnail_path, "JPEG", quality=85, optimize=True)
-                
-                # Get image dimensions
-                original_width, original_height = Image.open(file_path).size
-                
+            original_width, original_height = await asyncio.to_thread(_create_thumbnail, file_path, thumbnail_path)
         except Exception as e:
             # Clean up files if thumbnail generation fails
             if os.path.exists(file_path):
@@ -67,7 +134,7 @@ class FileService:
             file_path=file_path,
             thumbnail_path=thumbnail_path,
             file_size=os.path.getsize(file_path),
-            file_type=file.content_type,
+            file_type=content_type,
             width=original_width,
             height=original_height,
             uploaded_by=user_id
@@ -93,7 +160,7 @@ class FileService:
             uploaded_at=file_record.created_at
         )
 
-    async def delete_file(self, file_id: str, user_id: int) -> bool:
+    def delete_file(self, file_id: str, user_id: int) -> bool:
         """Delete a file and its thumbnail"""
         try:
             file_id_int = int(file_id)
@@ -123,7 +190,14 @@ class FileService:
         
         return True
 
-    async def get_files(self, skip: int = 0, limit: int = 100, file_type: str = "image", user_id: Optional[int] = None) -> List[schemas.UploadedFile]:
+    def get_files(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        file_type: str = "image",
+        user_id: Optional[int] = None,
+        cursor: Optional[int] = None
+    ) -> List[schemas.UploadedFile]:
         """Get list of uploaded files"""
         query = self.db.query(UploadedFile)
         
@@ -133,7 +207,7 @@ class FileService:
         if user_id:
             query = query.filter(UploadedFile.uploaded_by == user_id)
         
-        files = query.order_by(desc(UploadedFile.created_at)).offset(skip).limit(limit).all()
+        files = paginate(query, UploadedFile.id, skip, limit, cursor).all()
         
         # Generate URLs for response
         base_url = getattr(settings, 'BASE_URL', 'http://localhost:8000')
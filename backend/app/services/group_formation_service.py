@@ -17,7 +17,7 @@ import logging
 
 from app.models.models import Group, Interest, Destination, GroupMemberConfirmation, PaymentTransaction
 from app.core.database import SessionLocal
-from app.services.notification_service import NotificationService
+from app.services.notification_service import notification_service
 from app.services.payment_service import PaymentService
 from app.core.clustering_config import get_clustering_config
 
@@ -29,7 +29,8 @@ class GroupFormationWorkflow:
     
     def __init__(self, db: Session):
         self.db = db
-        self.notification_service = NotificationService(db)
+        # Shared instance: building SendGrid/Twilio clients per workflow is wasted work
+        self.notification_service = notification_service
         self.payment_service = PaymentService()
         
     # ===== GROUP LIFECYCLE MANAGEMENT =====
@@ -255,6 +256,7 @@ class GroupFormationWorkflow:
             
             # Send email and SMS notifications
             self.notification_service.send_notification(
+                db=self.db,
                 template_name='group_formation',
                 recipient_email=interest.user_email,
                 recipient_phone=interest.user_phone,
@@ -404,6 +406,7 @@ class GroupFormationWorkflow:
             }
             
             self.notification_service.send_notification(
+                db=self.db,
                 template_name='group_confirmed',
                 recipient_email=interest.user_email,
                 recipient_phone=interest.user_phone,
@@ -416,6 +419,12 @@ class GroupFormationWorkflow:
         declined_confirmations = [c for c in confirmations if c.confirmed == False or 
                                  (c.confirmed is None and datetime.utcnow() > c.expires_at)]
         
+        if declined_confirmations:
+            # Membership is shrinking, so the stored score no longer describes the group
+            self.db.query(Group).filter(Group.id == group_id).update(
+                {Group.avg_compatibility: None}, synchronize_session=False
+            )
+        
         for confirmation in declined_confirmations:
             interest = self.db.query(Interest).filter(Interest.id == confirmation.interest_id).first()
             
@@ -430,6 +439,7 @@ class GroupFormationWorkflow:
                 template_name = 'group_missed_deadline'
             
             self.notification_service.send_notification(
+                db=self.db,
                 template_name=template_name,
                 recipient_email=interest.user_email,
                 template_data={
@@ -464,6 +474,7 @@ class GroupFormationWorkflow:
             interest = self.db.query(Interest).filter(Interest.id == confirmation.interest_id).first()
             
             self.notification_service.send_notification(
+                db=self.db,
                 template_name='group_cancelled',
                 recipient_email=interest.user_email,
                 template_data={
@@ -5,10 +5,12 @@ Handles group CRUD operations, pricing calculations, and status management.
 
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, asc
+from sqlalchemy import and_, or_, asc
 from datetime import datetime, timedelta
 import logging
 
+from app.core.cache import DASHBOARD_SUMMARY_CACHE, invalidate_namespace
+from app.core.pagination import paginate
 from app.models.models import Group, Interest, Destination, Traveler
 from app.models.schemas import GroupCreate
 
@@ -26,7 +28,8 @@ class GroupService:
         destination_id: Optional[int] = None,
         status: Optional[str] = None,
         date_from: Optional[datetime] = None,
-        date_to: Optional[datetime] = None
+        date_to: Optional[datetime] = None,
+        cursor: Optional[int] = None
     ) -> List[Group]:
         """Get groups with optional filtering"""
         query = db.query(Group)
@@ -41,7 +44,7 @@ class GroupService:
         if date_to:
             query = query.filter(Group.date_to <= date_to)
         
-        return query.order_by(desc(Group.created_at)).offset(skip).limit(limit).all()
+        return paginate(query, Group.id, skip, limit, cursor).all()
 
     @staticmethod
     def get_group_by_id(db: Session, group_id: int) -> Optional[Group]:
@@ -99,10 +102,9 @@ class GroupService:
         # Store original pricing for comparison
         original_price = group.final_price_per_person
         
-        # Update fields
+        # Only the fields the client sent (already validated by GroupUpdate)
         for field, value in update_data.items():
-            if hasattr(group, field):
-                setattr(group, field, value)
+            setattr(group, field, value)
         
         # Recalculate pricing if base_price changed or manual override
         if 'final_price_per_person' in update_data or 'base_price' in update_data:
@@ -161,6 +163,7 @@ class GroupService:
         group.status = "confirmed"
         db.commit()
         db.refresh(group)
+        invalidate_namespace(DASHBOARD_SUMMARY_CACHE)
         
         # TODO: Trigger notification to group members
         logger.info(f"Confirmed group: {group.name} (ID: {group.id}) with {group.current_size} members")
@@ -188,6 +191,7 @@ class GroupService:
         
         db.commit()
         db.refresh(group)
+        invalidate_namespace(DASHBOARD_SUMMARY_CACHE)
         
         # TODO: Trigger cancellation notifications to members
         logger.info(f"Cancelled group: {group.name} (ID: {group.id})")
@@ -217,6 +221,7 @@ class GroupService:
         
         # Update group size and pricing
         group.current_size += interest.num_people
+        group.avg_compatibility = None  # membership changed; recomputed on read
         group.final_price_per_person = GroupService._calculate_group_pricing(
             base_price=group.base_price,
             current_size=group.current_size
@@ -245,6 +250,7 @@ class GroupService:
         
         # Update group size and pricing
         group.current_size -= interest.num_people
+        group.avg_compatibility = None  # membership changed; recomputed on read
         group.final_price_per_person = GroupService._calculate_group_pricing(
             base_price=group.base_price,
             current_size=group.current_size
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func
 from datetime import datetime, timedelta
 
+from app.core.pagination import paginate
 from app.models.models import Interest, Destination
 from app.models.schemas import InterestCreate, Interest as InterestResponse
 
@@ -161,9 +162,11 @@ class InterestService:
         status: Optional[str] = None,
         destination_id: Optional[int] = None,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[int] = None
     ) -> List[dict]:
         """Get interests with destination details for admin"""
+        # Destination columns come from the same JOIN, so a page is one query (no per-row lazy loads)
         query = self.db.query(
             Interest.id,
             Interest.destination_id,
@@ -192,7 +195,7 @@ class InterestService:
         if destination_id:
             query = query.filter(Interest.destination_id == destination_id)
             
-        interests = query.order_by(Interest.created_at.desc()).offset(skip).limit(limit).all()
+        interests = paginate(query, Interest.id, skip, limit, cursor).all()
         
         # Convert to dictionaries that match InterestWithDestination schema
         result = []
@@ -1,6 +1,7 @@
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
+from sqlalchemy.dialects.postgresql import insert
 
 from app.models.models import Page
 from app.models.schemas import PageCreate, PageUpdate
@@ -33,11 +34,19 @@ class PageService:
         return query.first()
 
     def create_page(self, page_data: PageCreate) -> Page:
-        """Create a new page"""
-        db_page = Page(**page_data.dict())
-        self.db.add(db_page)
+        """Create a new page; raises ValueError if the slug is already taken"""
+        # Single atomic INSERT ... ON CONFLICT (slug) DO NOTHING RETURNING *, instead of check-then-insert
+        stmt = insert(Page).values(**page_data.dict()).on_conflict_do_nothing(
+            index_elements=[Page.slug]
+        ).returning(Page)
+        db_page = self.db.scalars(stmt).first()
+        if db_page is None:
+            self.db.rollback()
+            raise ValueError(f"Page with slug '{page_data.slug}' already exists")
+        
+        # RETURNING already populated every column; detach so the commit doesn't expire them
+        self.db.expunge(db_page)
         self.db.commit()
-        self.db.refresh(db_page)
         return db_page
 
     def update_page(self, page_id: int, page_data: PageUpdate) -> Optional[Page]:
@@ -155,11 +164,14 @@ United States</p>
             }
         ]
 
-        created_pages = []
-        for page_data in default_pages:
-            existing_page = self.get_page_by_slug(page_data["slug"])
-            if not existing_page:
-                page = self.create_page(PageCreate(**page_data))
-                created_pages.append(page)
-
+        # One multi-row INSERT ... ON CONFLICT (slug) DO NOTHING; RETURNING yields only the pages actually created
+        rows = [PageCreate(**page_data).dict() for page_data in default_pages]
+        stmt = insert(Page).values(rows).on_conflict_do_nothing(
+            index_elements=[Page.slug]
+        ).returning(Page)
+        created_pages = self.db.scalars(stmt).all()
+        
+        for page in created_pages:
+            self.db.expunge(page)
+        self.db.commit()
         return created_pages
\ No newline at end of file
@@ -1,9 +1,11 @@
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func, desc, or_
+from sqlalchemy.dialects.postgresql import insert
 from datetime import datetime, timedelta
+import orjson
 
-from app.models.models import Interest, Destination, HomepageMessage
+from app.models.models import Interest, Destination, HomepageMessage, SocialProofCache
 from app.models.schemas import HomepageMessage as HomepageMessageSchema
 
 
@@ -398,14 +400,29 @@ class SocialProofService:
             # Return empty list on any error
             return []
 
-    async def get_active_homepage_messages(self, limit: int = 5) -> List[HomepageMessage]:
-        """Get active homepage messages with async support"""
-        return self.get_homepage_messages(limit=limit)
-
-    async def create_homepage_message(self, message_data) -> HomepageMessage:
-        """Create homepage message with async support"""  
-        db_message = HomepageMessage(**message_data)
-        self.db.add(db_message)
+    def get_cached_payload(self, scope: str) -> Optional[Any]:
+        """Get the precomputed payload for a scope, or None before the first refresh"""
+        return self.db.query(SocialProofCache.payload).filter(
+            SocialProofCache.scope == scope
+        ).scalar()
+
+    def refresh_cached_payloads(self) -> None:
+        """Recompute the smart/generated message payloads and store them in social_proof_cache"""
+        payloads = {
+            "smart": self.generate_smart_messages(),
+            "generated": self.generate_social_proof_messages(),
+        }
+        now = datetime.utcnow()
+        
+        for scope, payload in payloads.items():
+            # Round-trip through orjson so datetimes/dates are stored as ISO strings
+            stmt = insert(SocialProofCache).values(
+                scope=scope,
+                payload=orjson.loads(orjson.dumps(payload, default=str)),
+                generated_at=now
+            )
+            self.db.execute(stmt.on_conflict_do_update(
+                index_elements=[SocialProofCache.scope],
+                set_={"payload": stmt.excluded.payload, "generated_at": stmt.excluded.generated_at}
+            ))
         self.db.commit()
-        self.db.refresh(db_message)
-        return db_message
\ No newline at end of file
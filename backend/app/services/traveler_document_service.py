@@ -3,7 +3,7 @@ import uuid
 from typing import List, Optional, Dict, Any
 from fastapi import UploadFile, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func
 from datetime import datetime
 
 from app.models.models import (
@@ -15,22 +15,26 @@ from app.models.schemas import (
     PassengerDocumentCreate, TravelDocumentCreate,
     DocumentVerificationRequest
 )
+from app.core.cache import DOCUMENT_STATS_CACHE, TRAVELER_STATS_CACHE, invalidate_namespace
 from app.core.config import settings
+from app.services.file_service import FileTooLargeError, copy_upload
 
 
 class TravelerDocumentService:
+    # Configuration is fixed per process, so it lives on the class rather than being rebuilt per request
+    upload_path = getattr(settings, 'UPLOAD_PATH', '/app/uploads')
+    allowed_types = {
+        'aadhaar': ['image/jpeg', 'image/png', 'application/pdf'],
+        'pan': ['image/jpeg', 'image/png', 'application/pdf'],
+        'passport': ['image/jpeg', 'image/png', 'application/pdf'],
+        'driving_license': ['image/jpeg', 'image/png', 'application/pdf'],
+        'voter_id': ['image/jpeg', 'image/png', 'application/pdf'],
+        'travel_document': ['image/jpeg', 'image/png', 'application/pdf', 'text/plain']
+    }
+    max_file_size = getattr(settings, 'MAX_FILE_SIZE', 10 * 1024 * 1024)  # 10MB
+
     def __init__(self, db: Session):
         self.db = db
-        self.upload_path = getattr(settings, 'UPLOAD_PATH', '/app/uploads')
-        self.allowed_types = {
-            'aadhaar': ['image/jpeg', 'image/png', 'application/pdf'],
-            'pan': ['image/jpeg', 'image/png', 'application/pdf'],
-            'passport': ['image/jpeg', 'image/png', 'application/pdf'],
-            'driving_license': ['image/jpeg', 'image/png', 'application/pdf'],
-            'voter_id': ['image/jpeg', 'image/png', 'application/pdf'],
-            'travel_document': ['image/jpeg', 'image/png', 'application/pdf', 'text/plain']
-        }
-        self.max_file_size = getattr(settings, 'MAX_FILE_SIZE', 10 * 1024 * 1024)  # 10MB
 
     def upload_traveler_document(
         self, 
@@ -83,6 +87,7 @@ class TravelerDocumentService:
         
         self.db.add(db_document)
         self.db.commit()
+        invalidate_namespace(DOCUMENT_STATS_CACHE)
         self.db.refresh(db_document)
         
         return db_document
@@ -129,6 +134,7 @@ class TravelerDocumentService:
         
         self.db.add(db_document)
         self.db.commit()
+        invalidate_namespace(DOCUMENT_STATS_CACHE)
         self.db.refresh(db_document)
         
         return db_document
@@ -186,7 +192,28 @@ class TravelerDocumentService:
     ) -> List[TravelerDocument]:
         """Get all documents for a traveler"""
         
-        query = self.db.query(TravelerDocument).filter(
+        query = self._filter_traveler_documents(
+            self.db.query(TravelerDocument), traveler_id, document_type, verified_only
+        )
+        return query.order_by(TravelerDocument.uploaded_at.desc()).all()
+
+    def get_traveler_documents_version(
+        self, 
+        traveler_id: int, 
+        document_type: Optional[str] = None,
+        verified_only: bool = False
+    ) -> tuple:
+        """Row count and newest change time of a traveler's documents (ETag input)"""
+        
+        query = self.db.query(
+            func.count(TravelerDocument.id),
+            func.max(func.coalesce(TravelerDocument.updated_at, TravelerDocument.uploaded_at))
+        )
+        return tuple(self._filter_traveler_documents(query, traveler_id, document_type, verified_only).one())
+
+    @staticmethod
+    def _filter_traveler_documents(query, traveler_id: int, document_type: Optional[str], verified_only: bool):
+        query = query.filter(
             and_(
                 TravelerDocument.user_id == traveler_id,
                 TravelerDocument.is_active == True
@@ -199,7 +226,7 @@ class TravelerDocumentService:
         if verified_only:
             query = query.filter(TravelerDocument.verification_status == "verified")
         
-        return query.order_by(TravelerDocument.uploaded_at.desc()).all()
+        return query
 
     def get_passenger_documents(
         self, 
@@ -374,6 +401,8 @@ class TravelerDocumentService:
         if verification_request.document_type == "traveler_document" and verification_request.action == "verify":
             self._update_traveler_verification_status(document.user_id)
         
+        invalidate_namespace(DOCUMENT_STATS_CACHE)
+        invalidate_namespace(TRAVELER_STATS_CACHE)
         return True
 
     def delete_document(self, document_id: int, document_type: str, user_id: int) -> bool:
@@ -401,6 +430,7 @@ class TravelerDocumentService:
         
         document.is_active = False
         self.db.commit()
+        invalidate_namespace(DOCUMENT_STATS_CACHE)
         
         return True
 
@@ -436,10 +466,14 @@ class TravelerDocumentService:
         # Full file path
         file_path = os.path.join(upload_dir, unique_filename)
         
-        # Save file
-        with open(file_path, "wb") as f:
-            content = file.file.read()
-            f.write(content)
+        # Stream to disk in chunks; file.size is not always known up front, so the limit is enforced here too
+        try:
+            file_size = copy_upload(file.file, file_path, self.max_file_size)
+        except FileTooLargeError:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"File size too large. Maximum allowed: {self.max_file_size / (1024*1024):.1f}MB"
+            )
         
         # Generate URL (this would be configurable based on your setup)
         file_url = f"/api/v1/files/{subfolder}/{unique_filename}"
@@ -447,7 +481,7 @@ class TravelerDocumentService:
         return {
             'file_path': file_path,
             'file_url': file_url,
-            'file_size': len(content)
+            'file_size': file_size
         }
 
     def _should_be_primary(self, traveler_id: int, document_type: str) -> bool:
@@ -467,7 +501,7 @@ class TravelerDocumentService:
     def _update_traveler_verification_status(self, traveler_id: int) -> None:
         """Update traveler's overall document verification status"""
         
-        traveler = self.db.query(Traveler).filter(Traveler.id == traveler_id).first()
+        traveler = self.db.get(Traveler, traveler_id)
         if not traveler:
             return
         
@@ -520,7 +554,7 @@ class TravelerDocumentService:
         
         # Traveler document stats
         traveler_stats = self.db.query(TravelerDocument.verification_status, 
-                                     self.db.func.count(TravelerDocument.id)).filter(
+                                     func.count(TravelerDocument.id)).filter(
             TravelerDocument.is_active == True
         ).group_by(TravelerDocument.verification_status).all()
         
@@ -528,7 +562,7 @@ class TravelerDocumentService:
         
         # Passenger document stats
         passenger_stats = self.db.query(PassengerDocument.verification_status, 
-                                      self.db.func.count(PassengerDocument.id)).filter(
+                                      func.count(PassengerDocument.id)).filter(
             PassengerDocument.is_active == True
         ).group_by(PassengerDocument.verification_status).all()
         
@@ -1,6 +1,6 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func
 from fastapi import HTTPException, status
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
@@ -11,15 +11,24 @@ from app.models.schemas import (
     TravelerCreate, TravelerUpdate, TravelerProfile,
     UserCreate  # For backward compatibility
 )
+from app.core.cache import TRAVELER_STATS_CACHE, invalidate_namespace
 from app.core.config import settings
+from app.core.token_cache import TokenPrincipal, invalidate_traveler_tokens, traveler_tokens
+
+# Built once per process; constructing a CryptContext is far more expensive than the service itself
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class InactiveTravelerError(Exception):
+    """Raised when a valid token belongs to a deactivated traveler"""
 
 
 class TravelerService:
+    algorithm = "HS256"
+    access_token_expire_minutes = 60 * 24 * 7  # 7 days
+
     def __init__(self, db: Session):
         self.db = db
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        self.algorithm = "HS256"
-        self.access_token_expire_minutes = 60 * 24 * 7  # 7 days
 
     def register_traveler(self, traveler_data: TravelerCreate) -> Traveler:
         """Register a new traveler (public registration)"""
@@ -33,7 +42,7 @@ class TravelerService:
             )
         
         # Hash password
-        hashed_password = self.pwd_context.hash(traveler_data.password)
+        hashed_password = pwd_context.hash(traveler_data.password)
         
         # Create traveler
         db_traveler = Traveler(
@@ -65,6 +74,7 @@ class TravelerService:
         
         self.db.add(db_traveler)
         self.db.commit()
+        invalidate_namespace(TRAVELER_STATS_CACHE)
         self.db.refresh(db_traveler)
         
         return db_traveler
@@ -84,7 +94,7 @@ class TravelerService:
 
     def get_traveler_by_id(self, traveler_id: int) -> Optional[Traveler]:
         """Get traveler by ID"""
-        return self.db.query(Traveler).filter(Traveler.id == traveler_id).first()
+        return self.db.get(Traveler, traveler_id)
 
     def update_traveler_profile(
         self, 
@@ -137,6 +147,18 @@ class TravelerService:
         
         return query.order_by(Interest.created_at.desc()).offset(skip).limit(limit).all()
 
+    def get_traveler_interests_version(self, traveler_id: int, status: Optional[str] = None) -> tuple:
+        """Row count and newest change time of a traveler's interests (ETag input)"""
+        query = self.db.query(
+            func.count(Interest.id),
+            func.max(func.coalesce(Interest.updated_at, Interest.created_at))
+        ).filter(Interest.user_id == traveler_id)
+        
+        if status:
+            query = query.filter(Interest.status == status)
+        
+        return tuple(query.one())
+
     def verify_email(self, traveler_id: int) -> bool:
         """Mark traveler's email as verified"""
         traveler = self.get_traveler_by_id(traveler_id)
@@ -169,17 +191,30 @@ class TravelerService:
         encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=self.algorithm)
         return encoded_jwt
 
-    def verify_token(self, token: str) -> Optional[dict]:
+    @staticmethod
+    def verify_token(token: str) -> Optional[dict]:
         """Verify JWT token"""
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[self.algorithm])
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[TravelerService.algorithm])
             return payload
         except JWTError:
             return None
 
-    def get_current_traveler_from_token(self, token: str) -> Optional[Traveler]:
-        """Get current traveler from JWT token"""
-        payload = self.verify_token(token)
+    @staticmethod
+    def get_current_traveler_from_token(db: Session, token: str) -> Optional[Traveler]:
+        """
+        Get the active traveler for a JWT token, or None if the token is invalid.
+
+        Raises InactiveTravelerError for deactivated accounts. Recently seen tokens
+        skip decoding and resolve by primary key.
+        """
+        principal = traveler_tokens.get(token)
+        if principal is not None:
+            if not principal.is_active:
+                raise InactiveTravelerError()
+            return db.get(Traveler, principal.id)
+        
+        payload = TravelerService.verify_token(token)
         if not payload:
             return None
         
@@ -187,16 +222,32 @@ class TravelerService:
         if not email:
             return None
         
-        traveler = self.get_traveler_by_email(email)
+        # Tokens are verified locally (HS256); login tokens also carry traveler_id, so resolve
+        # by primary key (identity map first) and keep the email check that the sub lookup implied
+        traveler_id = payload.get("traveler_id")
+        if traveler_id is not None:
+            traveler = db.get(Traveler, traveler_id)
+            if traveler and traveler.email != email:
+                traveler = None
+        else:
+            traveler = db.query(Traveler).filter(Traveler.email == email).first()
+        if traveler:
+            traveler_tokens.put(
+                token,
+                TokenPrincipal(traveler.id, bool(traveler.is_active), bool(traveler.is_admin)),
+                payload.get("exp")
+            )
+            if not traveler.is_active:
+                raise InactiveTravelerError()
         return traveler
 
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify password"""
-        return self.pwd_context.verify(plain_password, hashed_password)
+        return pwd_context.verify(plain_password, hashed_password)
 
     def get_password_hash(self, password: str) -> str:
         """Hash password"""
-        return self.pwd_context.hash(password)
+        return pwd_context.hash(password)
 
     def change_password(
         self, 
@@ -223,6 +274,7 @@ class TravelerService:
         # Update password
         traveler.hashed_password = self.get_password_hash(new_password)
         self.db.commit()
+        invalidate_traveler_tokens(traveler_id)
         
         return True
 
@@ -234,6 +286,8 @@ class TravelerService:
         
         traveler.is_active = False
         self.db.commit()
+        invalidate_traveler_tokens(traveler_id)
+        invalidate_namespace(TRAVELER_STATS_CACHE)
         return True
 
     def reactivate_traveler(self, traveler_id: int) -> bool:
@@ -244,6 +298,8 @@ class TravelerService:
         
         traveler.is_active = True
         self.db.commit()
+        invalidate_traveler_tokens(traveler_id)
+        invalidate_namespace(TRAVELER_STATS_CACHE)
         return True
 
     # Admin functions
@@ -256,8 +312,22 @@ class TravelerService:
     ) -> List[Traveler]:
         """Get all travelers (admin only)"""
         
-        query = self.db.query(Traveler)
+        query = self._filter_travelers(self.db.query(Traveler), verified_only, search)
+        return query.order_by(Traveler.created_at.desc()).offset(skip).limit(limit).all()
+
+    def iter_travelers(
+        self,
+        verified_only: bool = False,
+        search: Optional[str] = None,
+        batch_size: int = 200
+    ) -> Iterator[Traveler]:
+        """Yield every matching traveler, fetching batch_size rows at a time from a server-side cursor"""
         
+        query = self._filter_travelers(self.db.query(Traveler), verified_only, search)
+        return iter(query.order_by(Traveler.created_at.desc()).yield_per(batch_size))
+
+    @staticmethod
+    def _filter_travelers(query, verified_only: bool, search: Optional[str]):
         if verified_only:
             query = query.filter(Traveler.documents_verified == True)
         
@@ -271,7 +341,7 @@ class TravelerService:
                 )
             )
         
-        return query.order_by(Traveler.created_at.desc()).offset(skip).limit(limit).all()
+        return query
 
     def get_traveler_statistics(self) -> Dict[str, Any]:
         """Get traveler statistics (admin only)"""
@@ -295,7 +365,7 @@ class TravelerService:
         # KYC status distribution
         kyc_stats = self.db.query(
             Traveler.kyc_status, 
-            self.db.func.count(Traveler.id)
+            func.count(Traveler.id)
         ).group_by(Traveler.kyc_status).all()
         
         kyc_distribution = {status: count for status, count in kyc_stats}
@@ -325,7 +395,7 @@ class TravelerService:
         """Create traveler profile from interest (admin only - after booking confirmation)"""
         
         # Get the interest
-        interest = self.db.query(Interest).filter(Interest.id == interest_id).first()
+        interest = self.db.get(Interest, interest_id)
         if not interest:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -371,6 +441,7 @@ class TravelerService:
         interest.user_id = db_traveler.id
         
         self.db.commit()
+        invalidate_namespace(TRAVELER_STATS_CACHE)
         self.db.refresh(db_traveler)
         
         return db_traveler
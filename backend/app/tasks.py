@@ -1,41 +1,107 @@
-from typing import List
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, raiseload
 from sqlalchemy import func, and_
 import numpy as np
 from sklearn.cluster import AgglomerativeClustering
+from app.core.cache import redis_client
 from app.core.database import SessionLocal
-from app.models.models import Interest, Group, Destination, HomepageMessage, GroupMemberConfirmation
+from app.models.models import Interest, Group, Destination, HomepageMessage, GroupMemberConfirmation, Traveler
+from app.services.notification_service import notification_service
+from app.services.socialproof_service import SocialProofService
 from app.worker import celery_app
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
 
-@celery_app.task
-def cluster_interests():
-    """Cluster similar interests into groups"""
-    db = SessionLocal()
+# Single-flight lock per destination; matches the worker's hard task_time_limit
+CLUSTERING_LOCK_TTL = 600
+
+
+def clustering_lock_key(destination_id: int) -> str:
+    return f"clustering:dest:{destination_id}"
+
+
+# Delete the lock only while it still holds the caller's token, so a job whose claim was
+# forced away cannot release the claim of the job that replaced it
+_release_if_owner = redis_client.register_script(
+    "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+)
+
+
+def acquire_clustering_lock(destination_id: int, token: str) -> bool:
+    """Claim the clustering slot for a destination; False if a run is already queued or running"""
+    return bool(redis_client.set(clustering_lock_key(destination_id), token, nx=True, ex=CLUSTERING_LOCK_TTL))
+
+
+def release_clustering_lock(destination_id: int, token: str):
+    """Release the clustering slot if it is still held by token"""
+    _release_if_owner(keys=[clustering_lock_key(destination_id)], args=[token])
+
+
+def clear_clustering_lock(destination_id: int):
+    """Drop the clustering slot whoever holds it (manual force)"""
+    redis_client.delete(clustering_lock_key(destination_id))
+
+
+def queue_destination_clustering(destination_id: int) -> Optional[str]:
+    """
+    Claim the destination's slot and queue its clustering job, using the job id as
+    the lock token. Returns the job id, or None if a run is already in flight.
+    """
+    job_id = str(uuid.uuid4())
+    if not acquire_clustering_lock(destination_id, job_id):
+        return None
     try:
-        # Get destinations with open interests
-        destinations_with_interests = db.query(Destination.id).join(Interest).filter(
-            Interest.status == 'open'
-        ).distinct().all()
+        cluster_interests.apply_async(kwargs={"destination_id": destination_id}, task_id=job_id)
+    except Exception:
+        # Nothing was queued to release the slot, so do not leave it held until the TTL
+        release_clustering_lock(destination_id, job_id)
+        raise
+    return job_id
+
+
+@celery_app.task(bind=True)
+def cluster_interests(self, destination_id: Optional[int] = None):
+    """
+    Cluster similar interests into groups for one destination. Without a
+    destination_id, fan out one task per destination with open interests,
+    skipping destinations that already have a run in flight.
+    """
+    if destination_id is None:
+        db = SessionLocal()
+        try:
+            # Get destinations with open interests
+            destinations_with_interests = db.query(Destination.id).join(Interest).filter(
+                Interest.status == 'open'
+            ).distinct().all()
+        finally:
+            db.close()
         
         logger.info(f"Found {len(destinations_with_interests)} destinations with interests")
         
-        for (destination_id,) in destinations_with_interests:
-            logger.info(f"Processing destination {destination_id}")
-            _cluster_destination_interests(db, destination_id)
-            
+        queued = 0
+        for (dest_id,) in destinations_with_interests:
+            if queue_destination_clustering(dest_id):
+                queued += 1
+        logger.info(f"Queued clustering for {queued} destinations")
+        return
+    
+    db = SessionLocal()
+    try:
+        logger.info(f"Processing destination {destination_id}")
+        _cluster_destination_interests(db, destination_id)
         db.commit()
-        logger.info("Clustering completed successfully")
+        logger.info(f"Clustering completed successfully for destination {destination_id}")
     except Exception as e:
-        logger.error(f"Error clustering interests: {e}")
-        db.rollback()
+        logger.error(f"Error clustering interests for destination {destination_id}: {e}")
         db.rollback()
     finally:
         db.close()
+        if self.request.id:
+            release_clustering_lock(destination_id, self.request.id)
 
 
 def _cluster_destination_interests(db: Session, destination_id: int):
@@ -261,6 +327,95 @@ def _calculate_lead_time_compatibility(interest1: Interest, interest2: Interest)
         return 0.3  # Different planning horizons
 
 
+def _compatibility_columns(interests: List[Interest]) -> dict:
+    """Stack the fields compatibility scoring reads into column arrays (struct-of-arrays)"""
+    return {
+        "date_from": np.array([i.date_from.timestamp() for i in interests], dtype=np.float64),
+        "date_to": np.array([i.date_to.timestamp() for i in interests], dtype=np.float64),
+        "start_day": np.array([i.date_from.date().toordinal() for i in interests], dtype=np.int64),
+        "num_people": np.array([i.num_people for i in interests], dtype=np.float64),
+        "has_budget": np.array([bool(i.budget_max) for i in interests], dtype=bool),
+        "budget_min": np.array([i.budget_min or 0 for i in interests], dtype=np.float64),
+        "budget_max": np.array([i.budget_max or 0 for i in interests], dtype=np.float64),
+    }
+
+
+def _calculate_compatibility_matrix(interests: List[Interest], others: Optional[List[Interest]] = None) -> np.ndarray:
+    """
+    Compatibility scores between interests as an (N, M) array.
+
+    Vectorized equivalent of calling _calculate_compatibility on every pair:
+    member fields are stacked into column arrays once and each factor is
+    computed by broadcasting. Without others the matrix is the (N, N) pairwise
+    matrix of interests, whose diagonal entries are self-comparisons.
+    """
+    if others is None:
+        others = interests
+    if not interests or not others:
+        return np.zeros((len(interests), len(others)), dtype=np.float64)
+    
+    a = _compatibility_columns(interests)
+    b = a if others is interests else _compatibility_columns(others)
+    
+    def pair(column):
+        return a[column][:, None], b[column][None, :]
+    
+    day = 86400.0
+    
+    # 1. Date overlap factor (40% weight)
+    from_a, from_b = pair("date_from")
+    to_a, to_b = pair("date_to")
+    overlap_start = np.maximum(from_a, from_b)
+    overlap_end = np.minimum(to_a, to_b)
+    overlap_days = np.floor((overlap_end - overlap_start) / day) + 1
+    total_days = np.maximum(np.floor((to_a - from_a) / day) + 1, np.floor((to_b - from_b) / day) + 1)
+    date_overlap = np.where(
+        overlap_start > overlap_end, 0.0, np.minimum(overlap_days / total_days, 1.0)
+    )
+    
+    # 2. Group size compatibility (25% weight)
+    people_a, people_b = pair("num_people")
+    size_ratio = np.minimum(people_a, people_b) / np.maximum(np.maximum(people_a, people_b), 1)
+    size_compatibility = np.select(
+        [people_a == people_b, size_ratio >= 0.7, size_ratio >= 0.5],
+        [1.0, 1.0, 0.7],
+        default=0.3
+    )
+    
+    # 3. Budget compatibility (20% weight); neutral when either side has no budget
+    min_a, min_b = pair("budget_min")
+    max_a, max_b = pair("budget_max")
+    budget_overlap_min = np.maximum(min_a, min_b)
+    budget_overlap_max = np.minimum(max_a, max_b)
+    max_range = np.maximum(max_a - min_a, max_b - min_b)
+    budget_ratio = np.divide(
+        budget_overlap_max - budget_overlap_min, max_range,
+        out=np.ones(max_range.shape, dtype=np.float64), where=max_range != 0
+    )
+    budget_compatibility = np.where(
+        budget_overlap_min > budget_overlap_max, 0.0, np.minimum(budget_ratio, 1.0)
+    )
+    has_budget_a, has_budget_b = pair("has_budget")
+    budget_compatibility = np.where(has_budget_a & has_budget_b, budget_compatibility, 0.8)
+    
+    # 4. Lead time similarity (15% weight); lead times share "now", so only start days matter
+    day_a, day_b = pair("start_day")
+    lead_diff = np.abs(day_a - day_b)
+    lead_time_compatibility = np.select(
+        [lead_diff <= 7, lead_diff <= 14, lead_diff <= 30],
+        [1.0, 0.8, 0.6],
+        default=0.3
+    )
+    
+    score = (
+        0.4 * date_overlap
+        + 0.25 * size_compatibility
+        + 0.2 * budget_compatibility
+        + 0.15 * lead_time_compatibility
+    )
+    return score / (0.4 + 0.25 + 0.2 + 0.15)
+
+
 def _ml_clustering(interests: List[Interest], initial_clusters: List[List[Interest]]) -> List[List[Interest]]:
     """Enhanced ML clustering using multiple algorithms and feature engineering"""
     try:
@@ -459,17 +614,17 @@ def _calculate_cluster_quality(cluster: List[Interest]) -> float:
     if len(cluster) < 2:
         return 0.0
     
-    total_compatibility = 0.0
-    comparisons = 0
-    
-    # Calculate average pairwise compatibility
-    for i, interest1 in enumerate(cluster):
-        for j, interest2 in enumerate(cluster[i+1:], i+1):
-            compatibility = _calculate_compatibility(interest1, interest2)
-            total_compatibility += compatibility
-            comparisons += 1
+    return _calculate_average_compatibility(cluster)
+
+
+def _calculate_average_compatibility(members: List[Interest]) -> float:
+    """Mean pairwise compatibility of a group's members (0-1); stored on Group.avg_compatibility"""
+    if len(members) < 2:
+        return 0.0
     
-    return total_compatibility / comparisons if comparisons > 0 else 0.0
+    # Average over the upper triangle (the score is symmetric)
+    matrix = _calculate_compatibility_matrix(members)
+    return float(matrix[np.triu_indices(len(members), k=1)].mean())
 
 
 def _optimize_cluster_composition(cluster: List[Interest]) -> List[Interest]:
@@ -477,14 +632,10 @@ def _optimize_cluster_composition(cluster: List[Interest]) -> List[Interest]:
     if len(cluster) <= 4:
         return cluster  # Keep small clusters as-is
     
-    # Calculate compatibility matrix
-    compatibility_scores = {}
-    for i, interest1 in enumerate(cluster):
-        total_score = 0.0
-        for j, interest2 in enumerate(cluster):
-            if i != j:
-                total_score += _calculate_compatibility(interest1, interest2)
-        compatibility_scores[i] = total_score / (len(cluster) - 1)
+    # Calculate each member's mean compatibility with the rest of the cluster
+    matrix = _calculate_compatibility_matrix(cluster)
+    np.fill_diagonal(matrix, 0.0)
+    compatibility_scores = dict(enumerate((matrix.sum(axis=1) / (len(cluster) - 1)).tolist()))
     
     # Remove least compatible members if cluster is too large
     sorted_members = sorted(compatibility_scores.items(), key=lambda x: x[1], reverse=True)
@@ -523,6 +674,7 @@ def _create_group_from_cluster(db: Session, destination: Destination, cluster: L
             final_price_per_person=pricing_details['final_price'],
             price_calc=pricing_details['calculation'],
             status="forming",
+            avg_compatibility=_calculate_average_compatibility(cluster),
             admin_notes=f"Auto-generated from {len(cluster)} interests via ML clustering"
         )
         
@@ -835,6 +987,19 @@ def generate_social_proof_messages():
         db.close()
 
 
+@celery_app.task
+def refresh_social_proof_cache():
+    """Precompute smart / generated social proof messages so their endpoints only read a row"""
+    db = SessionLocal()
+    try:
+        SocialProofService(db).refresh_cached_payloads()
+    except Exception as e:
+        logger.error(f"Error refreshing social proof cache: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
 @celery_app.task
 def optimize_existing_groups():
     """Optimize existing groups by potentially merging compatible groups or adding new members"""
@@ -884,18 +1049,16 @@ def _optimize_group_membership(db: Session, group: Group):
     
     # Get existing group members for compatibility checking
     existing_members = db.query(Interest).filter(Interest.group_id == group.id).all()
+    if not existing_members:
+        return
+    
+    # Check compatibility of every open interest with the existing members in one pass
+    avg_compatibility = _calculate_compatibility_matrix(open_interests, existing_members).mean(axis=1)
     
     compatible_interests = []
-    for interest in open_interests:
-        # Check compatibility with existing members
-        avg_compatibility = 0.0
-        for member in existing_members:
-            avg_compatibility += _calculate_compatibility(interest, member)
-        
-        avg_compatibility /= len(existing_members)
-        
+    for interest, score in zip(open_interests, avg_compatibility.tolist()):
         # Add if highly compatible and group has space
-        if avg_compatibility > 0.75 and group.current_size < group.max_size:
+        if score > 0.75 and group.current_size < group.max_size:
             compatible_interests.append(interest)
     
     # Add compatible interests to group
@@ -911,12 +1074,34 @@ def _optimize_group_membership(db: Session, group: Group):
             group.final_price_per_person = pricing_details['final_price']
             group.price_calc = pricing_details['calculation']
         
+        # Store the new membership's compatibility so group reads don't recompute it
+        group.avg_compatibility = _calculate_average_compatibility(existing_members + compatible_interests)
+        
         logger.info(f"Added {len(compatible_interests)} members to group {group.id}")
         
         # Notify new members
         _schedule_group_notifications(group.id, [i.id for i in compatible_interests])
 
 
+def _load_group_members(db: Session, group_ids: List[int]) -> Dict[int, List[Interest]]:
+    """
+    Batch-load members for several groups with a single IN query.
+
+    Compatibility scoring only reads scalar Interest columns, so relationships
+    are raiseloaded: any new relation access fails loudly instead of issuing a
+    query per member.
+    """
+    members_by_group: Dict[int, List[Interest]] = {group_id: [] for group_id in group_ids}
+    members = db.query(Interest).options(
+        raiseload("*")
+    ).filter(Interest.group_id.in_(group_ids)).all()
+    
+    for member in members:
+        members_by_group[member.group_id].append(member)
+    
+    return members_by_group
+
+
 def _attempt_group_merge(db: Session, group: Group):
     """Attempt to merge small groups with similar preferences"""
     # Find other small groups for the same destination
@@ -929,37 +1114,35 @@ def _attempt_group_merge(db: Session, group: Group):
         Group.date_from <= group.date_from + timedelta(days=5)
     ).all()
     
-    for candidate in candidate_groups:
-        # Check if merged group would be viable
-        combined_size = group.current_size + candidate.current_size
+    # Check if merged group would be viable (don't exceed max size)
+    viable_candidates = [c for c in candidate_groups if group.current_size + c.current_size <= 20]
+    if not viable_candidates:
+        return
+    
+    # Get members for the group and every candidate in one query
+    members_by_group = _load_group_members(db, [group.id] + [c.id for c in viable_candidates])
+    group1_members = members_by_group.get(group.id, [])
+    
+    for candidate in viable_candidates:
+        group2_members = members_by_group.get(candidate.id, [])
         
-        if combined_size <= 20:  # Don't exceed max size
-            # Get members from both groups
-            group1_members = db.query(Interest).filter(Interest.group_id == group.id).all()
-            group2_members = db.query(Interest).filter(Interest.group_id == candidate.id).all()
-            
-            # Check overall compatibility
-            compatibility_score = _calculate_group_merge_compatibility(group1_members, group2_members)
-            
-            if compatibility_score > 0.7:
-                # Merge groups
-                _merge_groups(db, group, candidate, group1_members, group2_members)
-                logger.info(f"Merged groups {group.id} and {candidate.id}")
-                break  # Only merge with one group at a time
+        # Check overall compatibility
+        compatibility_score = _calculate_group_merge_compatibility(group1_members, group2_members)
+        
+        if compatibility_score > 0.7:
+            # Merge groups
+            _merge_groups(db, group, candidate, group1_members, group2_members)
+            logger.info(f"Merged groups {group.id} and {candidate.id}")
+            break  # Only merge with one group at a time
 
 
 def _calculate_group_merge_compatibility(group1_members: List[Interest], group2_members: List[Interest]) -> float:
     """Calculate compatibility score for merging two groups"""
-    total_compatibility = 0.0
-    comparisons = 0
+    if not group1_members or not group2_members:
+        return 0.0
     
     # Check compatibility between all members of both groups
-    for member1 in group1_members:
-        for member2 in group2_members:
-            total_compatibility += _calculate_compatibility(member1, member2)
-            comparisons += 1
-    
-    return total_compatibility / comparisons if comparisons > 0 else 0.0
+    return float(_calculate_compatibility_matrix(group1_members, group2_members).mean())
 
 
 def _merge_groups(db: Session, primary_group: Group, secondary_group: Group, 
@@ -981,6 +1164,7 @@ def _merge_groups(db: Session, primary_group: Group, secondary_group: Group,
     pricing_details = _calculate_group_pricing(primary_group.destination, all_members)
     primary_group.final_price_per_person = pricing_details['final_price']
     primary_group.price_calc = pricing_details['calculation']
+    primary_group.avg_compatibility = _calculate_average_compatibility(all_members)
     
     # Update group name to reflect larger size
     primary_group.name = _generate_group_name(
@@ -1034,7 +1218,6 @@ def _merge_groups(db: Session, primary_group: Group, secondary_group: Group,
 @celery_app.task
 def send_interest_confirmation(interest_id: int):
     """Send confirmation email/WhatsApp for new interest submission"""
-    from app.services.notification_service import notification_service
     
     db = SessionLocal()
     try:
@@ -1078,10 +1261,36 @@ def send_interest_confirmation(interest_id: int):
         db.close()
 
 
+@celery_app.task
+def send_document_upload_notification(traveler_id: int, document_name: str, document_category: str, admin_name: str = "Admin"):
+    """Notify a traveler that an admin uploaded a document for them"""
+    
+    db = SessionLocal()
+    try:
+        traveler = db.get(Traveler, traveler_id)
+        if not traveler:
+            logger.error(f"Traveler {traveler_id} not found")
+            return
+        
+        result = notification_service.send_document_upload_notification(
+            db=db,
+            traveler=traveler,
+            document_name=document_name,
+            document_category=document_category,
+            admin_name=admin_name
+        )
+        
+        logger.info(f"Document upload notification sent to traveler {traveler_id}: {result}")
+        
+    except Exception as e:
+        logger.exception(f"Error sending document upload notification to traveler {traveler_id}: {e}")
+    finally:
+        db.close()
+
+
 @celery_app.task
 def send_group_match_notification(group_id: int):
     """Send notifications to all members when a group is formed"""
-    from app.services.notification_service import notification_service
     
     db = SessionLocal()
     try:
@@ -1141,7 +1350,6 @@ def send_group_match_notification(group_id: int):
 @celery_app.task
 def send_pricing_update_notification(group_id: int, old_price: float, new_price: float):
     """Send notifications when group pricing changes"""
-    from app.services.notification_service import notification_service
     
     db = SessionLocal()
     try:
@@ -1194,7 +1402,6 @@ def send_pricing_update_notification(group_id: int, old_price: float, new_price:
 @celery_app.task
 def send_follow_up_sequence():
     """Send follow-up messages to users who haven't been matched to groups"""
-    from app.services.notification_service import notification_service
     from datetime import timedelta
     
     db = SessionLocal()
@@ -1252,7 +1459,6 @@ def send_follow_up_sequence():
 @celery_app.task
 def send_marketing_campaign(campaign_data: dict):
     """Send targeted marketing campaigns based on user behavior and preferences"""
-    from app.services.notification_service import notification_service
     
     db = SessionLocal()
     try:
@@ -1311,7 +1517,6 @@ def send_marketing_campaign(campaign_data: dict):
 @celery_app.task
 def process_notification_webhooks(webhook_data: dict):
     """Process delivery status updates from email/SMS providers"""
-    from app.services.notification_service import notification_service
     
     db = SessionLocal()
     try:
@@ -1458,10 +1663,9 @@ def process_payment_webhook(webhook_data: dict):
                 
                 # Send payment failure notification
                 interest = db.query(Interest).filter(Interest.id == confirmation.interest_id).first()
-                from app.services.notification_service import NotificationService
-                notification_service = NotificationService(db)
                 
                 notification_service.send_notification(
+                    db=db,
                     template_name='payment_failed',
                     recipient_email=interest.user_email,
                     template_data={
@@ -1548,6 +1752,8 @@ def cleanup_expired_confirmations():
                 
                 # Check if group should be cancelled due to too many expired confirmations
                 group = db.query(Group).filter(Group.id == confirmation.group_id).first()
+                if group and interest:
+                    group.avg_compatibility = None  # membership changed; recomputed on read
                 if group and group.status == 'pending_confirmation':
                     
                     active_confirmations = db.query(GroupMemberConfirmation).filter(
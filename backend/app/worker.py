@@ -36,6 +36,14 @@ celery_app.conf.update(
                 "priority": 3  # Lower priority
             }
         },
+        "refresh-social-proof-cache": {
+            "task": "app.tasks.refresh_social_proof_cache",
+            "schedule": 300.0,  # Run every 5 minutes
+            "options": {
+                "queue": "default",
+                "priority": 3
+            }
+        },
         "update-analytics": {
             "task": "app.tasks.update_analytics",
             "schedule": 86400.0,  # Run daily
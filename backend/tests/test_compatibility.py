@@ -0,0 +1,75 @@
+"""
+The vectorized compatibility kernel must agree with the scalar reference on every pair
+"""
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.tasks import _calculate_compatibility, _calculate_compatibility_matrix
+
+UTC = timezone.utc
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def _interest(date_from, date_to, num_people=2, budget_min=None, budget_max=None):
+    # Compatibility only reads these attributes, so no session or mapper is involved
+    return SimpleNamespace(
+        date_from=date_from,
+        date_to=date_to,
+        num_people=num_people,
+        budget_min=budget_min,
+        budget_max=budget_max,
+    )
+
+
+def _day(month, day, tz=UTC, hour=0):
+    return datetime(2027, month, day, hour, tzinfo=tz)
+
+
+INTERESTS = [
+    # Overlapping trips with overlapping budget ranges
+    _interest(_day(3, 1), _day(3, 10), 2, 1000, 2000),
+    _interest(_day(3, 5), _day(3, 15), 2, 1500, 3000),
+    # Disjoint dates, no budget at all
+    _interest(_day(5, 1), _day(5, 7), 4),
+    # Single-day trip with a fixed budget; budget_min missing on the next one
+    _interest(_day(3, 1), _day(3, 1), 1, 1500, 1500),
+    _interest(_day(3, 8), _day(3, 20), 3, None, 1800),
+    # Size ratio exactly 0.7 against the next, and 0.5 against 14 people
+    _interest(_day(3, 15), _day(3, 22), 7, 5000, 9000),
+    _interest(_day(3, 31), _day(4, 4), 10, 2500, 2500),
+    _interest(_day(4, 14), _day(4, 20), 14, 100, 400),
+    # Lead-time edges: exactly 7, 14 and 30 days after 3 Mar
+    _interest(_day(3, 3), _day(3, 6), 5),
+    _interest(_day(3, 10), _day(3, 12), 5),
+    _interest(_day(3, 17), _day(3, 19), 5),
+    _interest(_day(4, 2), _day(4, 9), 5),
+    # Non-UTC offset late in the day (calendar date differs from the UTC one)
+    _interest(_day(3, 20, IST, hour=23), _day(3, 25, IST, hour=23), 2, 1200, 2500),
+]
+
+
+def test_matrix_matches_scalar_for_every_pair():
+    matrix = _calculate_compatibility_matrix(INTERESTS)
+    
+    assert matrix.shape == (len(INTERESTS), len(INTERESTS))
+    for i, first in enumerate(INTERESTS):
+        for j, second in enumerate(INTERESTS):
+            assert matrix[i, j] == pytest.approx(_calculate_compatibility(first, second), abs=1e-9), (i, j)
+
+
+def test_matrix_against_other_interests_matches_scalar():
+    members, candidates = INTERESTS[:5], INTERESTS[5:]
+    matrix = _calculate_compatibility_matrix(members, candidates)
+    
+    assert matrix.shape == (len(members), len(candidates))
+    for i, member in enumerate(members):
+        for j, candidate in enumerate(candidates):
+            assert matrix[i, j] == pytest.approx(_calculate_compatibility(member, candidate), abs=1e-9), (i, j)
+
+
+def test_empty_inputs_give_empty_matrix():
+    assert _calculate_compatibility_matrix([]).shape == (0, 0)
+    assert _calculate_compatibility_matrix(INTERESTS[:2], []).shape == (2, 0)